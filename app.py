@@ -1,17 +1,32 @@
+import time
+STARTUP_BEGAN = time.perf_counter()  # Cold-start report, see the end of this block
+
 import os
 import re
-import asyncio
+import base64
+import mimetypes
 import tempfile
 import json
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_file, Response, session
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, Response, session
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
+from sqlalchemy import tuple_
 from dotenv import load_dotenv
 from liebe.orchestrator import orchestrator
-from models import db, DailyNote, Alarm, ChatMessage, FailedAttempt
-import edge_tts
+from liebe.http_client import http_client
+from liebe.briefing import briefing_preparer, generate_briefing
+from liebe.chat_writer import chat_writer
+from liebe.conversation import conversation_memory
+from liebe.tts import tts_cache, tts_engine, SpeechStream, clean_tts_text, VOICE
+from liebe.metrics import metrics
+from liebe.uploads import upload_store, UploadTooLarge, DIGEST_RE
+from liebe.ingest import document_ingestor
+from liebe.assets import asset_manifest
+from liebe.streams import stream_buffer
+from models import db, DailyNote, Alarm, ChatMessage, ChatSession, FailedAttempt
+STARTUP_IMPORTED = time.perf_counter()
 
 # Load environment variables
 load_dotenv()
@@ -32,8 +47,13 @@ app = Flask(
 app.secret_key = os.getenv('SESSION_SECRET', 'liebe-ultra-secure-fallback-key-999')
 
 # Use a hashed password from environment or fallback to hashed default
-DEFAULT_HASH = generate_password_hash('liebe123')
-app.config['USER_PASSWORD_HASH'] = os.getenv('APP_PASSWORD_HASH', DEFAULT_HASH)
+# (the default is hashed on first login rather than on every cold start)
+app.config['USER_PASSWORD_HASH'] = os.getenv('APP_PASSWORD_HASH')
+
+def default_password_hash():
+    if not app.config.get('DEFAULT_PASSWORD_HASH'):
+        app.config['DEFAULT_PASSWORD_HASH'] = generate_password_hash('liebe123')
+    return app.config['DEFAULT_PASSWORD_HASH']
 
 # Secure Session Settings
 app.config.update(
@@ -66,15 +86,41 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 
 db.init_app(app)
 
-with app.app_context():
-    try:
-        db.create_all()
-        print("Database connected and initialized successfully.")
-    except Exception as e:
-        print(f"❌ Database Error: {str(e)}")
+# Schema changes run from maintenance.py migrate; only the throwaway sqlite fallback is created here
+if os.getenv("DB_AUTO_CREATE", "1" if DATABASE_URL.startswith("sqlite") else "0") == "1":
+    with app.app_context():
+        try:
+            db.create_all()
+            print("Database connected and initialized successfully.")
+        except Exception as e:
+            print(f"❌ Database Error: {str(e)}")
+STARTUP_DATABASE = time.perf_counter()
 
 CORS(app) # Enable CORS for all routes
 
+# Messages that could not be committed at shutdown are kept here and written on the next start
+chat_writer.init_app(app, os.path.join(os.path.abspath(BASE_TMP_PATH), "chat_spill.jsonl"))
+conversation_memory.init_app(app)
+# Fingerprinted assets from scripts/build_static.py; templates fall back to /static without a build
+asset_manifest.init_dir(app.static_folder)
+app.add_template_global(asset_manifest.url, 'asset_url')
+
+# Prepare wake-up briefings ahead of each alarm (background threads don't survive on Vercel)
+briefing_preparer.init_app(app, os.path.join(os.path.abspath(BASE_TMP_PATH), "briefings"))
+tts_cache.init_dir(os.path.join(os.path.abspath(BASE_TMP_PATH), "tts_cache"))
+if os.getenv("BRIEFING_PREPARER", "1") == "1" and not os.getenv("VERCEL"):
+    briefing_preparer.start()
+if os.getenv("OLLAMA_WARMUP", "1") == "1" and not os.getenv("VERCEL"):
+    orchestrator.warm_ollama()
+
+STARTUP_TIMINGS = {
+    'imports': round((STARTUP_IMPORTED - STARTUP_BEGAN) * 1000, 1),
+    'database': round((STARTUP_DATABASE - STARTUP_IMPORTED) * 1000, 1),
+    'services': round((time.perf_counter() - STARTUP_DATABASE) * 1000, 1),
+}
+STARTUP_TIMINGS['total'] = round(sum(STARTUP_TIMINGS.values()), 1)
+print(f"Startup: {STARTUP_TIMINGS['total']} ms (imports {STARTUP_TIMINGS['imports']} ms, database {STARTUP_TIMINGS['database']} ms, services {STARTUP_TIMINGS['services']} ms)")
+
 def require_auth(f):
     from functools import wraps
     @wraps(f)
@@ -103,7 +149,7 @@ def login():
         minutes = int((remaining % 3600) // 60)
         return jsonify({'error': f'Too many failed attempts. Locked for {hours}h {minutes}m.'}), 403
 
-    current_hash = app.config.get('USER_PASSWORD_HASH')
+    current_hash = app.config.get('USER_PASSWORD_HASH') or default_password_hash()
     
     if check_password_hash(current_hash, password):
         print(f"[DEBUG] Login SUCCESS for {ip}")
@@ -138,6 +184,28 @@ def auth_status():
 def home():
     return render_template('index.html')
 
+@app.route('/static/dist/<path:filename>')
+def serve_dist_asset(filename):
+    # Hashed names change with their content, so browsers may keep them forever
+    path, encoding = asset_manifest.compressed(filename, request.accept_encodings)
+    if not path or not os.path.isfile(path):
+        return jsonify({'error': 'Not found'}), 404
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.route('/sw.js')
+def service_worker():
+    # Served from the root so its scope covers the app; no-cache lets a new build's worker install promptly
+    response = Response(asset_manifest.service_worker(), mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/chat', methods=['POST'])
 @require_auth
 def chat():
@@ -150,99 +218,170 @@ def chat():
 
     search_enabled = data.get('search_enabled', False)
     deep_thinking_enabled = data.get('deep_thinking_enabled', False)
-    chat_history = data.get('history', [])
+    # Optional: speak the reply sentence by sentence while it streams
+    speech = SpeechStream(tts_engine, tts_cache) if data.get('speak') else None
+
+    # Persisted through the write-behind queue; the stream itself never holds a DB connection
+    chat_writer.add('user', user_message, session_id=session_id,
+                    file_path=data.get('file_path'), file_type=data.get('file_type'))
 
     def generate():
-        with app.app_context():
-            full_reply = ""
-            try:
-                user_msg = ChatMessage(
-                    role='user', 
-                    content=user_message, 
-                    session_id=session_id,
-                    file_path=data.get('file_path'),
-                    file_type=data.get('file_type')
-                )
-                db.session.add(user_msg)
-                db.session.commit()
-            except Exception as e: print(f"DB Error: {e}")
-
-            for update_str in orchestrator.chat_stream(
-                user_message, 
-                history=chat_history,
-                force_search=search_enabled, 
-                force_deep_thinking=deep_thinking_enabled
-            ):
-                update = json.loads(update_str)
-                if update.get('status') == 'done':
-                    full_reply = update.get('full_text', '')
-                yield f"data: {update_str}\n\n"
-            
-            if full_reply:
-                try:
-                    ai_msg = ChatMessage(role='assistant', content=full_reply, session_id=session_id)
-                    db.session.add(ai_msg)
-                    db.session.commit()
-                except Exception as e: print(f"DB Error: {e}")
-
-    return Response(generate(), mimetype='text/event-stream')
+        full_reply = ""
+        for update_str in orchestrator.chat_stream(
+            user_message, 
+            force_search=search_enabled, 
+            force_deep_thinking=deep_thinking_enabled,
+            session_id=session_id,
+            attachment=data.get('file_path')
+        ):
+            update = json.loads(update_str)
+            if update.get('status') == 'done':
+                full_reply = update.get('full_text', '')
+            yield update_str
+            if speech:
+                for audio_str in speech.feed(update):
+                    yield audio_str
+
+        if full_reply:
+            chat_writer.add('assistant', full_reply, session_id=session_id)
+
+    # Generated independently of this connection; a client that drops resumes via /api/chat/stream
+    generation = stream_buffer.start(generate())
+    return event_stream(generation)
+
+@app.route('/api/chat/stream/<stream_id>', methods=['GET'])
+@require_auth
+def resume_chat_stream(stream_id):
+    # EventSource sends Last-Event-ID on reconnect; fetch-based clients may pass ?after=<seq> instead
+    generation = stream_buffer.get(stream_id)
+    if not generation:
+        return jsonify({'error': 'Stream expired'}), 404
+    last = stream_buffer.parse_event_id(request.headers.get('Last-Event-ID'))
+    after = last[1] if last and last[0] == stream_id else request.args.get('after', 0, type=int)
+    return event_stream(generation, after)
+
+def event_stream(generation, after=0):
+    response = Response(stream_buffer.follow(generation, after), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Keep reverse proxies from holding frames back
+    response.headers['X-Stream-Id'] = generation.id
+    return response
 
 @app.route('/api/chat/history', methods=['GET'])
 @require_auth
 def get_chat_history():
+    # Keyset pagination on (timestamp, id) so every page is an index range scan
     session_id = request.args.get('session_id', 'default')
-    messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp.asc()).all()
-    return jsonify([m.to_dict() for m in messages])
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    before = decode_cursor(request.args.get('before'))
+    after = decode_cursor(request.args.get('after'))
+    if (request.args.get('before') and not before) or (request.args.get('after') and not after):
+        return jsonify({'error': 'Invalid cursor'}), 400
+    key = tuple_(ChatMessage.timestamp, ChatMessage.id)
+
+    query = ChatMessage.query.filter_by(session_id=session_id)
+    if after:
+        # Newer than the cursor, oldest first
+        rows = query.filter(key > tuple_(*after)).order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        messages = rows[:limit]
+    else:
+        # Latest N (optionally older than the cursor), fetched newest first and flipped
+        if before:
+            query = query.filter(key < tuple_(*before))
+        rows = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        messages = list(reversed(rows[:limit]))
+
+    return jsonify({
+        'messages': [m.to_dict() for m in messages],
+        'has_more': has_more,
+        'before': encode_cursor(messages[0]) if messages else None,
+        'after': encode_cursor(messages[-1]) if messages else None
+    })
+
+def encode_cursor(message):
+    raw = f"{message.timestamp.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        ts, msg_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(ts), int(msg_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
 
 UPLOAD_FOLDER = os.path.join(os.path.abspath(BASE_TMP_PATH), "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+upload_store.init_dir(UPLOAD_FOLDER)
+document_ingestor.init_dir(UPLOAD_FOLDER)
+# Reject oversized bodies before they are read; multipart framing gets a little headroom
+app.config['MAX_CONTENT_LENGTH'] = upload_store.max_bytes + 1024 * 1024
 
 @app.route('/api/upload', methods=['POST'])
 @require_auth
 def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    
-    filename = f"{datetime.now().timestamp()}_{file.filename}"
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(file_path)
-    
-    file_type = file.content_type
+    # Multipart form uploads, or the raw body with the name in X-Filename
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file part'}), 400
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
+        filename, file_type, stream = file.filename, file.content_type, file.stream
+    else:
+        filename = request.headers.get('X-Filename', '')
+        if not filename:
+            return jsonify({'error': 'No selected file'}), 400
+        file_type, stream = request.mimetype, request.stream
+
+    try:
+        digest, size, created = upload_store.save(stream)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+
+    name = upload_store.display_name(filename)
+    file_type = file_type or upload_store.content_type(name)
+    # Text is extracted into the knowledge base in the background
+    document_ingestor.submit(digest, upload_store.path(digest), name, file_type)
     return jsonify({
-        'file_path': f"/api/uploads/{filename}",
-        'file_type': file_type
+        'file_path': upload_store.url(digest, name),
+        'file_type': file_type,
+        'size': size,
+        'deduplicated': not created
     })
 
-# Helper route to serve uploads from /tmp (or system temp)
+@app.route('/api/uploads/<digest>/<name>')
+def serve_upload_object(digest, name):
+    # Content never changes under a digest, so clients may cache it forever
+    if not DIGEST_RE.fullmatch(digest) or not os.path.exists(upload_store.path(digest)):
+        return jsonify({'error': 'Not found'}), 404
+    response = send_file(upload_store.path(digest), mimetype=upload_store.content_type(name), download_name=name,
+                         conditional=True, etag=digest, max_age=31536000)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+# Helper route to serve uploads from /tmp (or system temp); legacy timestamp-named files
 @app.route('/api/uploads/<filename>')
 def serve_upload(filename):
-    return send_file(os.path.join(UPLOAD_FOLDER, filename))
+    return send_from_directory(UPLOAD_FOLDER, filename, conditional=True, max_age=86400)
 
 @app.route('/api/chat/sessions', methods=['GET'])
 @require_auth
 def get_sessions():
-    # Group sessions and find last message for each
-    from sqlalchemy import func
-    subquery = db.session.query(
-        ChatMessage.session_id,
-        func.max(ChatMessage.timestamp).label('max_ts')
-    ).group_by(ChatMessage.session_id).subquery()
-    
-    # Get the last "user" message for each session to use as title
-    sessions = db.session.query(ChatMessage).join(
-        subquery,
-        (ChatMessage.session_id == subquery.c.session_id) & (ChatMessage.timestamp == subquery.c.max_ts)
-    ).order_by(ChatMessage.timestamp.desc()).all()
-    
+    # Read from the incrementally maintained summary table instead of aggregating chat_message
+    sessions = ChatSession.query.order_by(ChatSession.last_timestamp.desc()).all()
     return jsonify([s.to_dict() for s in sessions])
 
 @app.route('/api/chat/history', methods=['DELETE'])
 @require_auth
 def clear_chat_history():
+    chat_writer.flush()  # Queued messages must not reappear after the wipe
     ChatMessage.query.delete()
+    ChatSession.query.delete()
     db.session.commit()
     return jsonify({"status": "success"})
 
@@ -250,28 +389,37 @@ def clear_chat_history():
 @require_auth
 def get_top_weather():
     city = request.args.get('city', 'Mumbai')
-    # Use the existing orchestrator method
-    result = orchestrator.get_weather(city)
-    
-    if "WEATHER ERROR" in result:
-        return jsonify({'error': result})
-    
-    # Extract details using regex from the formatted string
-    temp_match = re.search(r"\*\*Temperature:\*\* (.*?)°C", result)
-    desc_match = re.search(r"\*\*Conditions:\*\* (.*?)\n", result)
-    humidity_match = re.search(r"\*\*Humidity:\*\* (.*?)%", result)
-    wind_match = re.search(r"\*\*Wind Speed:\*\* (.*?) m/s", result)
-    
-    if temp_match:
-        return jsonify({
-            'temp': temp_match.group(1),
-            'desc': desc_match.group(1) if desc_match else "Clear",
-            'humidity': humidity_match.group(1) if humidity_match else "N/A",
-            'wind': wind_match.group(1) if wind_match else "N/A",
-            'city': city
-        })
-    
-    return jsonify({'error': 'Failed to parse', 'raw': result})
+    report = orchestrator.get_weather_report(city)
+    return jsonify(report.to_dict())
+
+@app.route('/api/cache_stats', methods=['GET'])
+@require_auth
+def get_cache_stats():
+    return jsonify(orchestrator.get_cache_stats())
+
+@app.route('/api/http_stats', methods=['GET'])
+@require_auth
+def get_http_stats():
+    return jsonify(http_client.get_stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Scrapers authenticate with METRICS_TOKEN; a logged-in browser session also works
+    token = os.getenv('METRICS_TOKEN')
+    bearer = request.headers.get('Authorization', '') == f'Bearer {token}' if token else False
+    if not bearer and not session.get('authenticated'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/startup_stats', methods=['GET'])
+@require_auth
+def get_startup_stats():
+    return jsonify(STARTUP_TIMINGS)
+
+@app.route('/api/router_stats', methods=['GET'])
+@require_auth
+def get_router_stats():
+    return jsonify(orchestrator.router.get_stats())
 
 @app.route('/api/morning_briefing', methods=['POST'])
 @require_auth
@@ -279,55 +427,51 @@ def get_morning_briefing():
     data = request.json
     city = data.get('city', 'Mumbai')
     notes = data.get('notes', [])
-    
-    # 1. Fetch Weather
-    weather_info = orchestrator.get_weather(city)
-    
-    # 2. Fetch News about India
-    news_info = orchestrator.search_web("top news India today", search_type="news")
-    
-    now = datetime.now()
-    date_time_str = now.strftime("%A, %B %d, %Y at %I:%M %p")
-    
-    # Determine dynamic greeting
-    hour = now.hour
-    if 5 <= hour < 12:
-        greeting = "Good morning"
-    elif 12 <= hour < 17:
-        greeting = "Good afternoon"
-    elif 17 <= hour < 21:
-        greeting = "Good evening"
-    else:
-        greeting = "Hello"
-    
-    # 3. Construct prompt for Liebe to create a script
-    prompt = f"""
-    Create a warm, professional, and helpful wake-up script for the user.
-    Context:
-    - Today's Date and Time: {date_time_str}
-    - Weather: {weather_info}
-    - News: {news_info}
-    - User's Tasks for Today: {", ".join(notes) if notes else "No tasks listed."}
-    
-    Structure:
-    1. Greeting ({greeting}!)
-    2. Tell today's date and the current time.
-    3. Summarize the weather and give advice (e.g., carry an umbrella).
-    4. Highlight 3 top news stories about India.
-    5. Remind them of their tasks from their notes.
-    6. Give an inspiring closing sentence.
-    
-    Keep it conversational and suitable for Text-to-Speech. Use plain text, no markdown.
-    """
-    
-    # Use a faster model for the script
-    script, _ = orchestrator.chat(prompt, force_search=False, bypass_intent=True)
-    
-    return jsonify({
-        'script': script,
-        'weather': weather_info,
-        'news': news_info
-    })
+    trace = metrics.trace("morning_briefing")
+    response = jsonify(generate_briefing(city, notes, trace=trace))
+    trace.finish()
+    response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.route('/api/alarms/<int:alarm_id>/briefing', methods=['GET'])
+@require_auth
+def get_prepared_briefing(alarm_id):
+    briefing = briefing_preparer.get(alarm_id)
+    if not briefing:
+        return jsonify({'status': 'pending'}), 404
+    return jsonify(briefing)
+
+@app.route('/api/alarms/<int:alarm_id>/briefing/audio', methods=['GET'])
+@require_auth
+def get_prepared_briefing_audio(alarm_id):
+    path = briefing_preparer.audio_path(alarm_id)
+    if not path:
+        return jsonify({'error': 'Not found'}), 404
+    return send_file(path, mimetype="audio/mpeg", conditional=True)
+
+def send_cached_audio(path, key):
+    response = send_file(path, mimetype="audio/mpeg", conditional=True, etag=key, max_age=86400)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+@app.route('/api/tts/segment/<key>')
+@require_auth
+def tts_segment(key):
+    # Sentence audio announced by /api/chat 'audio' events; may still be synthesizing
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        return "Not found", 404
+    trace = metrics.trace("tts_segment")
+    with trace.span("synthesis_wait"):
+        tts_engine.wait(key)
+    cached = tts_cache.lookup(key)
+    if not cached:
+        trace.finish(status="error")
+        return "Not found", 404
+    trace.finish()
+    response = send_cached_audio(cached, key)
+    response.headers['Server-Timing'] = trace.server_timing()
+    return response
 
 @app.route('/api/tts')
 @require_auth
@@ -337,33 +481,41 @@ def tts():
         return "No text provided", 400
     
     # Clean up text for better TTS
-    text = re.sub(r'\*+', '', text)
-    text = re.sub(r'\[.*?\]', '', text) # Remove any remaining tags
-    
-    voice = "en-US-AriaNeural"
+    text = clean_tts_text(text)
+    voice = VOICE
+
+    # Identical (text, voice) pairs are served from the disk cache with ETag/Range support
+    trace = metrics.trace("tts")
+    key = tts_cache.key(text, voice)
+    with trace.span("cache_lookup"):
+        cached = tts_cache.lookup(key)
+    if cached:
+        trace.finish()
+        response = send_cached_audio(cached, key)
+        response.headers['Server-Timing'] = trace.server_timing()
+        return response
     
-    async def _amain():
-        communicate = edge_tts.Communicate(text, voice)
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                yield chunk["data"]
-
-    def generate():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        gen = _amain()
+    def stream():
+        # Errors propagate through tee() so a truncated stream never lands in the cache
+        status = "aborted"
+        started = time.perf_counter()
         try:
-            while True:
-                try:
-                    yield loop.run_until_complete(gen.__anext__())
-                except StopAsyncIteration:
-                    break
+            for i, chunk in enumerate(tts_cache.tee(key, tts_engine.stream(text, voice))):
+                if i == 0: trace.record("first_audio", time.perf_counter() - started)
+                yield chunk
+            trace.record("synthesis", time.perf_counter() - started)
+            status = "ok"
         except Exception as e:
+            status = "error"
             print(f"TTS Generation Error: {e}")
         finally:
-            loop.close()
+            trace.finish(status=status)
 
-    return Response(generate(), mimetype="audio/mpeg")
+    response = Response(stream(), mimetype="audio/mpeg")
+    response.set_etag(key)
+    # Only the lookup is known before streaming; synthesis stages are exported to /metrics
+    response.headers['Server-Timing'] = trace.server_timing()
+    return response
 
 @app.route('/api/youtube/suggest', methods=['GET'])
 @require_auth
@@ -375,15 +527,95 @@ def suggest_youtube_videos():
 
 # --- DATABASE API ENDPOINTS ---
 
+# Tombstones older than this are purged, so a client that last synced before it gets a full snapshot
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+# Cursors trail the clock so rows committed late with an earlier updated_at are not skipped
+SYNC_SKEW_SECONDS = float(os.getenv("SYNC_SKEW_SECONDS", "5"))
+
+def list_etag(query, model):
+    # Every insert, update and (soft) delete bumps updated_at, so count + max covers all changes
+    count, latest = query.with_entities(db.func.count(model.id), db.func.max(model.updated_at)).one()
+    return f"{model.__tablename__}-{count}-{latest.isoformat() if latest else 0}"
+
+def conditional_list(query, model):
+    """Live rows of query as JSON, or 304 when the client's copy (If-None-Match) is still current."""
+    etag = list_etag(query, model)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify([row.to_dict() for row in query.filter(model.deleted_at.is_(None)).all()])
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def encode_sync_cursor(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip('=')
+
+def decode_sync_cursor(cursor):
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def soft_delete(row):
+    row.deleted_at = row.updated_at = datetime.utcnow()
+    db.session.commit()
+
+def purge_tombstones():
+    horizon = datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    removed = 0
+    for model in (DailyNote, Alarm):
+        removed += model.query.filter(model.deleted_at < horizon).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+@app.route('/api/sync', methods=['GET'])
+@require_auth
+def sync_changes():
+    """
+    Notes and alarms changed since the cursor: upserts plus ids of deleted rows.
+    Without a cursor (or one older than the tombstone horizon) every live row is returned with reset=true
+    and the client should replace its copy.
+    """
+    cursor = request.args.get('since')
+    since = decode_sync_cursor(cursor) if cursor else None
+    if cursor and not since:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    now = datetime.utcnow()
+    reset = since is None or since < now - timedelta(days=SYNC_TOMBSTONE_DAYS)
+
+    result = {'reset': reset}
+    latest = since
+    for key, model in (('notes', DailyNote), ('alarms', Alarm)):
+        query = model.query
+        if reset:
+            query = query.filter(model.deleted_at.is_(None))
+        else:
+            query = query.filter(model.updated_at > since)
+        rows = query.order_by(model.updated_at.asc()).all()
+        result[key] = {
+            'upserts': [r.to_dict() for r in rows if r.deleted_at is None],
+            'deletes': [r.id for r in rows if r.deleted_at is not None]
+        }
+        if rows and rows[-1].updated_at and (latest is None or rows[-1].updated_at > latest):
+            latest = rows[-1].updated_at
+
+    # Re-sending the last few seconds is harmless (upserts are idempotent); missing a row is not
+    watermark = now - timedelta(seconds=SYNC_SKEW_SECONDS)
+    next_cursor = min(latest, watermark) if latest else watermark
+    if since and next_cursor < since:
+        next_cursor = since
+    result['cursor'] = encode_sync_cursor(next_cursor)
+    return jsonify(result)
+
 @app.route('/api/notes', methods=['GET'])
 @require_auth
 def get_notes():
     date_str = request.args.get('date')
+    query = DailyNote.query
     if date_str:
-        notes = DailyNote.query.filter_by(date_str=date_str).all()
-    else:
-        notes = DailyNote.query.all()
-    return jsonify([n.to_dict() for n in notes])
+        query = query.filter_by(date_str=date_str)
+    return conditional_list(query, DailyNote)
 
 @app.route('/api/notes', methods=['POST'])
 @require_auth
@@ -402,18 +634,16 @@ def add_note():
 @app.route('/api/notes/<int:note_id>', methods=['DELETE'])
 @require_auth
 def delete_note(note_id):
-    note = DailyNote.query.get(note_id)
+    note = DailyNote.query.filter_by(id=note_id, deleted_at=None).first()
     if note:
-        db.session.delete(note)
-        db.session.commit()
+        soft_delete(note)
         return jsonify({"success": True})
     return jsonify({"error": "Not found"}), 404
 
 @app.route('/api/alarms', methods=['GET'])
 @require_auth
 def get_alarms():
-    alarms = Alarm.query.all()
-    return jsonify([a.to_dict() for a in alarms])
+    return conditional_list(Alarm.query, Alarm)
 
 @app.route('/api/alarms', methods=['POST'])
 @require_auth
@@ -427,22 +657,22 @@ def add_alarm_db():
     )
     db.session.add(new_alarm)
     db.session.commit()
+    briefing_preparer.discard(new_alarm.id)
     return jsonify(new_alarm.to_dict()), 201
 
 @app.route('/api/alarms/<int:alarm_id>', methods=['DELETE'])
 @require_auth
 def delete_alarm_db(alarm_id):
-    alarm = Alarm.query.get(alarm_id)
+    alarm = Alarm.query.filter_by(id=alarm_id, deleted_at=None).first()
     if alarm:
-        db.session.delete(alarm)
-        db.session.commit()
+        soft_delete(alarm)
         return jsonify({"success": True})
     return jsonify({"error": "Not found"}), 404
 
 @app.route('/api/alarms/<int:alarm_id>', methods=['PATCH'])
 @require_auth
 def update_alarm_db(alarm_id):
-    alarm = Alarm.query.get(alarm_id)
+    alarm = Alarm.query.filter_by(id=alarm_id, deleted_at=None).first()
     if not alarm:
         return jsonify({"error": "Not found"}), 404
     
@@ -0,0 +1,20 @@
+import os
+
+# /api/chat (SSE) and /api/tts (audio) spend nearly all their time waiting on upstream I/O.
+# gevent workers multiplex those streams cooperatively instead of pinning one sync worker per
+# open stream; requests, httpx (Gemini/Groq/Ollama SDKs) and pg8000 all yield on their sockets.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Long LLM generations and briefings must not be killed as "hung" workers
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def worker_exit(server, worker):
+    # Drain the chat write-behind queue before the worker goes away
+    from liebe.chat_writer import chat_writer
+    if not chat_writer.flush():
+        server.log.warning("Worker %s exited with unwritten chat messages (spilled to disk)", worker.pid)
@@ -0,0 +1,95 @@
+import os
+import re
+import json
+import hashlib
+from werkzeug.security import safe_join
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Variants written by scripts/build_static.py, best first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Files that need a stable URL: the PWA manifest and the service worker itself
+UNHASHED = {"manifest.json", "sw.js"}
+# Assets the service worker precaches, as plain static names
+PRECACHE = ("css/style.css", "js/script.js", "icons/icon-512.png")
+
+
+def content_hash(path, length=10):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:length]
+
+
+class AssetManifest:
+    """
+    Maps static files to the content-hashed copies built by scripts/build_static.py (static/dist).
+    Hashed files never change, so they are served with immutable caching and precompressed variants.
+    An entry whose source has been edited since the last build falls back to the plain /static URL,
+    so a forgotten rebuild never serves stale code.
+    """
+    def __init__(self):
+        self.static_dir = None
+        self.dist_dir = None
+        self.entries = {}   # 'js/script.js' -> 'js/script.<hash>.js'
+        self.worker = None
+
+    def init_dir(self, static_dir):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        self.load()
+
+    def load(self):
+        self.entries, self.worker = {}, None
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        stale = []
+        for source, entry in manifest.get("files", {}).items():
+            try:
+                fresh = content_hash(os.path.join(self.static_dir, source)) == entry["hash"]
+            except OSError:
+                fresh = False
+            if fresh and os.path.exists(os.path.join(self.dist_dir, entry["path"])):
+                self.entries[source] = entry["path"]
+            else:
+                stale.append(source)
+        if stale:
+            print(f"Asset manifest is stale for {', '.join(stale)}; run scripts/build_static.py")
+
+    def url(self, filename):
+        hashed = self.entries.get(filename)
+        if hashed:
+            return f"/static/{DIST_DIR}/{hashed}"
+        return f"/static/{filename}"
+
+    def version(self):
+        # Changes whenever any precached file does, which makes the browser install a new worker
+        urls = "|".join(self.url(name) for name in PRECACHE)
+        return "liebe-" + hashlib.sha256(urls.encode()).hexdigest()[:10]
+
+    def service_worker(self):
+        """static/sw.js with its cache name and precache list taken from the manifest."""
+        if self.worker is None:
+            with open(os.path.join(self.static_dir, "sw.js"), "r", encoding="utf-8") as f:
+                source = f.read()
+            assets = ",\n".join(f"    '{url}'" for url in ["/"] + [self.url(name) for name in PRECACHE])
+            source = re.sub(r"const CACHE_NAME = '[^']*';", lambda m: f"const CACHE_NAME = '{self.version()}';", source, count=1)
+            source = re.sub(r"const ASSETS = \[[^\]]*\];", lambda m: f"const ASSETS = [\n{assets}\n];", source, count=1)
+            self.worker = source
+        return self.worker
+
+    def compressed(self, filename, accept_encodings):
+        """(path, encoding) of the best precompressed variant the client accepts, or (path, None)."""
+        path = safe_join(self.dist_dir, filename)
+        if path is None:
+            return None, None
+        for encoding, ext in ENCODINGS:
+            if accept_encodings[encoding] and os.path.exists(path + ext):
+                return path + ext, encoding
+        return path, None
+
+asset_manifest = AssetManifest()
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from liebe.orchestrator import orchestrator
+from liebe.tts import VOICE, clean_tts_text, tts_engine
+from liebe.metrics import metrics
+
+
+def generate_briefing(city="Mumbai", notes=None, now=None, trace=None):
+    """Builds the wake-up script from live weather and news. now lets a prepared briefing speak as of the alarm time."""
+    notes = notes or []
+    now = now or datetime.now()
+    trace = trace or metrics.trace("briefing")
+
+    # 1. Fetch Weather
+    with trace.span("weather"):
+        weather_info = orchestrator.get_weather(city)
+
+    # 2. Fetch News about India
+    with trace.span("news"):
+        news_info = orchestrator.search_web("top news India today", search_type="news")
+
+    date_time_str = now.strftime("%A, %B %d, %Y at %I:%M %p")
+
+    # Determine dynamic greeting
+    hour = now.hour
+    if 5 <= hour < 12:
+        greeting = "Good morning"
+    elif 12 <= hour < 17:
+        greeting = "Good afternoon"
+    elif 17 <= hour < 21:
+        greeting = "Good evening"
+    else:
+        greeting = "Hello"
+
+    # 3. Construct prompt for Liebe to create a script
+    prompt = f"""
+    Create a warm, professional, and helpful wake-up script for the user.
+    Context:
+    - Today's Date and Time: {date_time_str}
+    - Weather: {weather_info}
+    - News: {news_info}
+    - User's Tasks for Today: {", ".join(notes) if notes else "No tasks listed."}
+
+    Structure:
+    1. Greeting ({greeting}!)
+    2. Tell today's date and the current time.
+    3. Summarize the weather and give advice (e.g., carry an umbrella).
+    4. Highlight 3 top news stories about India.
+    5. Remind them of their tasks from their notes.
+    6. Give an inspiring closing sentence.
+
+    Keep it conversational and suitable for Text-to-Speech. Use plain text, no markdown.
+    """
+
+    # Use a faster model for the script
+    script, service = orchestrator.chat(prompt, force_search=False, bypass_intent=True, trace=trace)
+
+    return {
+        'script': script,
+        'service': service,  # "none" when generation failed and script holds the error
+        'weather': weather_info,
+        'news': news_info
+    }
+
+
+def minutes_until(time_value, now):
+    """Minutes from now until the next occurrence of an 'HH:MM' alarm, or None if unparsable."""
+    try:
+        hour, minute = (int(p) for p in time_value.split(':')[:2])
+    except (ValueError, AttributeError):
+        return None
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target < now - timedelta(minutes=1):
+        target += timedelta(days=1)
+    return (target - now).total_seconds() / 60
+
+
+class BriefingPreparer:
+    """
+    Background worker that builds the briefing script and audio for each upcoming alarm
+    BRIEFING_LEAD_MINUTES before it fires, stores them on disk and flips Alarm.prepared.
+    """
+    def __init__(self):
+        self.app = None
+        self.storage_dir = None
+        self.lead_minutes = float(os.getenv("BRIEFING_LEAD_MINUTES", "10"))
+        self.poll_interval = float(os.getenv("BRIEFING_POLL_INTERVAL", "30"))
+        self.retention_hours = float(os.getenv("BRIEFING_RETENTION_HOURS", "24"))
+        self.city = os.getenv("BRIEFING_CITY", "Mumbai")
+        self.tz = os.getenv("BRIEFING_TZ")  # Alarm times are the user's wall clock
+        self.thread = None
+
+    def init_app(self, app, storage_dir):
+        self.app = app
+        self.storage_dir = storage_dir
+        os.makedirs(storage_dir, exist_ok=True)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._run, name="liebe-briefing", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.prepare_due()
+                self.cleanup()
+            except Exception as e: print(f"Briefing preparer error: {e}")
+            time.sleep(self.poll_interval)
+
+    def now(self):
+        if self.tz:
+            from zoneinfo import ZoneInfo
+            return datetime.now(ZoneInfo(self.tz)).replace(tzinfo=None)
+        return datetime.now()
+
+    def prepare_due(self):
+        from models import DailyNote, Alarm
+        now = self.now()
+        with self.app.app_context():
+            due = []
+            for alarm in Alarm.query.filter_by(type='alarm', prepared=False, deleted_at=None).all():
+                mins = minutes_until(alarm.time_value, now)
+                if mins is not None and mins <= self.lead_minutes:
+                    due.append((alarm.id, now + timedelta(minutes=mins)))
+            if not due:
+                return
+            # Notes of the day each alarm fires on; an alarm just after midnight belongs to tomorrow
+            notes_by_day = {}
+            for _, fires_at in due:
+                day = fires_at.strftime("%a %b %d %Y")
+                if day not in notes_by_day:
+                    notes_by_day[day] = [n.content for n in DailyNote.query.filter_by(date_str=day, deleted_at=None).all()]
+
+        # DB session is released before the slow weather/news/LLM/TTS work
+        for alarm_id, fires_at in due:
+            self.prepare(alarm_id, notes_by_day[fires_at.strftime("%a %b %d %Y")], fires_at)
+
+    def _path(self, alarm_id, ext):
+        return os.path.join(self.storage_dir, f"alarm_{alarm_id}.{ext}")
+
+    def prepare(self, alarm_id, notes, fires_at=None):
+        # A lock file keeps multiple workers from preparing the same alarm
+        lock_path = self._path(alarm_id, "lock")
+        try:
+            if time.time() - os.path.getmtime(lock_path) > 600:
+                os.remove(lock_path)  # Left behind by a worker that died mid-preparation
+        except OSError: pass
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+        except FileExistsError:
+            return False
+
+        try:
+            trace = metrics.trace("briefing_prepare")
+            briefing = generate_briefing(self.city, notes, now=fires_at, trace=trace)
+            if briefing['service'] == "none" or not (briefing['script'] or "").strip():
+                # Nothing is stored and prepared stays False, so the next poll tries again
+                trace.finish(status="error")
+                print(f"Briefing generation failed for alarm {alarm_id}: {briefing['script']}")
+                return False
+            audio_path = self._path(alarm_id, "mp3")
+            try:
+                with open(audio_path + ".part", "wb") as f, trace.span("tts"):
+                    f.write(tts_engine.synthesize(clean_tts_text(briefing['script']), VOICE))
+                os.replace(audio_path + ".part", audio_path)
+                briefing['audio_url'] = f"/api/alarms/{alarm_id}/briefing/audio"
+            except Exception as e: print(f"Briefing TTS failed for alarm {alarm_id}: {e}")
+
+            briefing['prepared_at'] = time.time()
+            briefing['timings'] = trace.finish()
+            with open(self._path(alarm_id, "json.part"), "w", encoding="utf-8") as f:
+                json.dump(briefing, f)
+            os.replace(self._path(alarm_id, "json.part"), self._path(alarm_id, "json"))
+
+            from models import db, Alarm
+            with self.app.app_context():
+                alarm = db.session.get(Alarm, alarm_id)
+                if alarm and alarm.deleted_at is None:
+                    alarm.prepared = True
+                    db.session.commit()
+            return True
+        finally:
+            os.remove(lock_path)
+
+    def get(self, alarm_id):
+        try:
+            with open(self._path(alarm_id, "json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def discard(self, alarm_id):
+        # Row ids can be reused after a delete, so a new alarm must not inherit old artifacts
+        for ext in ("json", "mp3"):
+            try:
+                os.remove(self._path(alarm_id, ext))
+            except OSError: pass
+
+    def audio_path(self, alarm_id):
+        path = self._path(alarm_id, "mp3")
+        return path if os.path.exists(path) else None
+
+    def cleanup(self):
+        # Artifacts outlive the alarm row (the client deletes it as it rings) until retention expires
+        cutoff = time.time() - self.retention_hours * 3600
+        for name in os.listdir(self.storage_dir):
+            path = os.path.join(self.storage_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError: pass
+
+briefing_preparer = BriefingPreparer()
@@ -0,0 +1,109 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small in-process cache with a freshness TTL and an extra stale-while-revalidate window.
+    Fresh entries are returned as-is; stale ones are returned immediately while a background
+    thread reloads them; anything older is loaded inline. Concurrent misses for the same key
+    share a single loader call.
+    """
+    def __init__(self, ttl, stale_ttl=0, max_entries=256, name="cache"):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.name = name
+        self.entries = OrderedDict()  # key -> (value, stored_at)
+        self.refreshing = set()
+        self.inflight = {}  # key -> _Flight for loads currently running
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.time() - entry[1] < self.ttl:
+                return entry[0]
+        return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_or_load(self, key, loader, should_cache=None):
+        """Returns the cached value for key, calling loader() on a miss. should_cache(value) can veto storing errors."""
+        with self.lock:
+            entry = self.entries.get(key)
+            age = time.time() - entry[1] if entry else None
+            if entry and age < self.ttl:
+                self.stats["hits"] += 1
+                self.entries.move_to_end(key)
+                return entry[0]
+            if entry and age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                if key not in self.refreshing:
+                    self.refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key, loader, should_cache), daemon=True).start()
+                return entry[0]
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.stats["misses"] += 1
+                flight = self.inflight[key] = _Flight()
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+            flight.resolve(value)
+            return value
+        except Exception as e:
+            flight.fail(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def _refresh(self, key, loader, should_cache):
+        try:
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.set(key, value)
+        except Exception as e: print(f"{self.name} refresh failed for {key}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def resolve(self, value):
+        self.value = value
+        self.event.set()
+
+    def fail(self, error):
+        self.error = error
+        self.event.set()
+
+    def wait(self):
+        self.event.wait()
+        if self.error: raise self.error
+        return self.value
@@ -0,0 +1,249 @@
+import os
+import glob
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+
+class ChatWriter:
+    """
+    Write-behind queue for ChatMessage rows.
+    Streaming requests only enqueue; a background thread inserts batches in a single transaction,
+    so no pooled DB connection is held while the LLM generates. flush() drains synchronously and
+    runs at interpreter/worker exit; batches that still can't be committed are spilled to disk and
+    written on the next start, so queued messages are not lost.
+    """
+    def __init__(self):
+        self.app = None
+        self.queue = queue.Queue()
+        # Queued or in-flight items until committed, so prompts can include them (see pending)
+        self.unwritten = []
+        self.unwritten_lock = threading.Lock()
+        self.batch_size = int(os.getenv("CHAT_WRITE_BATCH", "50"))
+        self.flush_interval = float(os.getenv("CHAT_WRITE_INTERVAL", "0.5"))
+        self.flush_timeout = float(os.getenv("CHAT_FLUSH_TIMEOUT", "10"))
+        self.spill_path = None
+        # Serverless instances freeze after the response, so there writes stay inline
+        self.write_behind = os.getenv("CHAT_WRITE_BEHIND", "0" if os.getenv("VERCEL") else "1") == "1"
+        self.thread = None
+        self.write_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+
+    def init_app(self, app, spill_path=None):
+        self.app = app
+        self.spill_path = spill_path
+        atexit.register(self.flush)
+        if spill_path:
+            self._replay()
+
+    def _ensure_thread(self):
+        with self.start_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="liebe-chat-writer", daemon=True)
+                self.thread.start()
+
+    def add(self, role, content, session_id='default', file_path=None, file_type=None):
+        # Timestamp at enqueue time so ordering reflects the conversation, not the flush
+        item = {
+            'role': role,
+            'content': content,
+            'session_id': session_id,
+            'file_path': file_path,
+            'file_type': file_type,
+            'timestamp': datetime.utcnow()
+        }
+        if not self.write_behind:
+            if not self._write([item]):
+                self._spill([item])
+            return
+        with self.unwritten_lock:
+            self.unwritten.append(item)
+        self.queue.put(item)
+        self._ensure_thread()
+
+    def _drain(self, first=None):
+        batch = [first] if first else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            time.sleep(self.flush_interval)  # Let a burst accumulate into one transaction
+            with self.write_lock:
+                batch = self._drain(first)
+                if not self._write(batch):
+                    # Still unwritten: retried on the next pass, or spilled by flush() at exit
+                    for item in batch:
+                        self.queue.put(item)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write(self, batch, retries=3):
+        from models import db, ChatMessage
+        for attempt in range(retries):
+            try:
+                with self.app.app_context():
+                    try:
+                        db.session.add_all([ChatMessage(**item) for item in batch])
+                        self._update_sessions(db, batch)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+                self._committed(batch)
+                return True
+            except Exception as e:
+                print(f"DB Error (chat write, attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+        return False
+
+    def _committed(self, batch):
+        written = {id(item) for item in batch}
+        with self.unwritten_lock:
+            self.unwritten = [item for item in self.unwritten if id(item) not in written]
+
+    def _update_sessions(self, db, batch):
+        # Keep the ChatSession summary in the same transaction as the inserts
+        from models import ChatSession
+        by_session = {}
+        for item in batch:
+            by_session.setdefault(item['session_id'], []).append(item)
+
+        for session_id, items in by_session.items():
+            # Batches can commit out of order (flush vs. the writer thread, retries, replayed spills)
+            last = max(items, key=lambda i: i['timestamp'])
+            first_user = next((i['content'] for i in items if i['role'] == 'user'), None)
+            # Atomic increment so concurrent workers don't lose counts
+            updated = ChatSession.query.filter_by(session_id=session_id).update(
+                {ChatSession.message_count: ChatSession.message_count + len(items)}, synchronize_session=False)
+            if updated:
+                ChatSession.query.filter(
+                    ChatSession.session_id == session_id,
+                    db.or_(ChatSession.last_timestamp.is_(None), ChatSession.last_timestamp <= last['timestamp'])
+                ).update({
+                    ChatSession.last_message: last['content'],
+                    ChatSession.last_role: last['role'],
+                    ChatSession.last_timestamp: last['timestamp'],
+                }, synchronize_session=False)
+                if first_user:
+                    ChatSession.query.filter_by(session_id=session_id, title=None).update(
+                        {ChatSession.title: first_user[:255]}, synchronize_session=False)
+            else:
+                db.session.add(ChatSession(
+                    session_id=session_id,
+                    title=first_user[:255] if first_user else None,
+                    last_message=last['content'],
+                    last_role=last['role'],
+                    last_timestamp=last['timestamp'],
+                    message_count=len(items)
+                ))
+
+    def flush(self, timeout=None):
+        """
+        Writes everything still queued, waiting up to timeout for a batch the writer thread holds.
+        Returns False if some messages could not be committed; those are spilled to disk instead.
+        """
+        deadline = time.time() + (self.flush_timeout if timeout is None else timeout)
+        while True:
+            with self.write_lock:
+                batch = self._drain()
+                if batch:
+                    ok = self._write(batch)
+                    for _ in batch:
+                        self.queue.task_done()
+                    if ok:
+                        continue
+                    break
+            with self.unwritten_lock:
+                if not self.unwritten:
+                    return True
+            if time.time() >= deadline:
+                break
+            time.sleep(0.05)  # The writer thread is committing a batch it already picked up
+
+        with self.write_lock:
+            while self._drain():
+                pass
+            with self.unwritten_lock:
+                items, self.unwritten = self.unwritten, []
+        self._spill(items)
+        return False
+
+    def _spill(self, items):
+        if not self.spill_path:
+            print(f"Lost {len(items)} chat messages: database unavailable and no spill file configured")
+            return
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(dict(item, timestamp=item['timestamp'].isoformat())) + "\n")
+            print(f"Spilled {len(items)} unwritten chat messages to {self.spill_path}")
+        except OSError as e:
+            print(f"Lost {len(items)} chat messages: could not write {self.spill_path}: {e}")
+
+    def _claim_spills(self):
+        """
+        Moves the spill file (and claims left by workers that died mid-replay) to a name owned by this
+        process. os.replace is atomic, so when several workers start together each file is replayed once.
+        """
+        claimed = []
+        candidates = [self.spill_path]
+        for path in glob.glob(f"{self.spill_path}.*.replay"):
+            try:
+                pid = int(path.rsplit(".", 2)[1].split("-")[0])
+                if pid != os.getpid():
+                    os.kill(pid, 0)
+                    continue  # Its worker is alive and replaying it
+            except ProcessLookupError:
+                pass
+            except (ValueError, OSError):
+                continue
+            candidates.append(path)
+        for i, path in enumerate(candidates):
+            target = f"{self.spill_path}.{os.getpid()}-{i}.replay"
+            try:
+                os.replace(path, target)
+                claimed.append(target)
+            except OSError: pass  # Missing, or another worker took it first
+        return claimed
+
+    def _replay(self):
+        # Messages spilled by an earlier process; skip any that did get committed after the spill
+        from models import ChatMessage
+        for path in self._claim_spills():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    items = [json.loads(line) for line in f if line.strip()]
+                for item in items:
+                    item['timestamp'] = datetime.fromisoformat(item['timestamp'])
+                with self.app.app_context():
+                    items = [i for i in items if not ChatMessage.query.filter_by(
+                        session_id=i['session_id'], role=i['role'], content=i['content'], timestamp=i['timestamp']).first()]
+            except Exception as e:
+                print(f"Could not replay {path}: {e}")
+                continue
+            if items and not self._write(items):
+                self._spill(items)  # Back to the spill file for the next start
+            else:
+                print(f"Recovered {len(items)} chat messages from {self.spill_path}")
+            try:
+                os.remove(path)
+            except OSError: pass
+
+    def pending(self, session_id):
+        """Messages for session_id that are queued or being written but not yet committed."""
+        with self.unwritten_lock:
+            return [m for m in self.unwritten if m['session_id'] == session_id]
+
+chat_writer = ChatWriter()
@@ -0,0 +1,122 @@
+import os
+import threading
+from liebe.knowledge_index import estimate_tokens
+from liebe.chat_writer import chat_writer
+
+
+class ConversationMemory:
+    """
+    Builds prompt history from persisted ChatMessage rows instead of client-sent history.
+    The newest turns are kept verbatim within CONTEXT_TOKEN_BUDGET; turns that fall out of that window
+    are folded into a rolling summary cached on ChatSession, recomputed in the background only when
+    new turns drop out.
+    """
+    def __init__(self):
+        self.app = None
+        self.token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.max_messages = int(os.getenv("CONTEXT_MAX_MESSAGES", "40"))
+        self.summary_words = int(os.getenv("CONTEXT_SUMMARY_WORDS", "150"))
+        self.summary_input_tokens = int(os.getenv("CONTEXT_SUMMARY_INPUT_TOKENS", "4000"))
+        self.summarizing = set()
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def build(self, session_id, current=None):
+        """Returns (summary, messages) for session_id; current is the user message being answered."""
+        from models import db, ChatMessage, ChatSession
+        with self.app.app_context():
+            rows = ChatMessage.query.filter_by(session_id=session_id).order_by(
+                ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(self.max_messages).all()
+            session = db.session.get(ChatSession, session_id)
+            summary = session.summary if session else None
+            summary_upto = (session.summary_upto_id or 0) if session else 0
+            turns = [{'id': r.id, 'role': r.role, 'content': r.content, 'timestamp': r.timestamp} for r in reversed(rows)]
+
+        # Turns still in the write-behind queue are part of the conversation too
+        committed = {(t['role'], t['content'], t['timestamp']) for t in turns}
+        for item in chat_writer.pending(session_id):
+            if (item['role'], item['content'], item['timestamp']) not in committed:
+                turns.append(dict(item, id=None))
+        if current and turns and turns[-1]['role'] == 'user' and turns[-1]['content'] == current:
+            turns.pop()
+
+        # Newest first until the budget is spent
+        used = 0
+        start = len(turns)
+        while start > 0 and len(turns) - start < self.max_messages:
+            cost = estimate_tokens(turns[start - 1]['content'])
+            if used + cost > self.token_budget:
+                break
+            used += cost
+            start -= 1
+
+        dropped = [t['id'] for t in turns[:start] if t['id']]
+        if (dropped and max(dropped) > summary_upto) or (start == 0 and len(rows) == self.max_messages and rows[-1].id > summary_upto):
+            boundary = next((t['id'] for t in turns[start:] if t['id']), None)
+            self._schedule_summary(session_id, boundary)
+
+        return summary, [{'role': t['role'], 'content': t['content']} for t in turns[start:]]
+
+    def _schedule_summary(self, session_id, boundary):
+        with self.lock:
+            if session_id in self.summarizing:
+                return
+            self.summarizing.add(session_id)
+        threading.Thread(target=self._summarize, args=(session_id, boundary), name="liebe-summary", daemon=True).start()
+
+    def _summarize(self, session_id, boundary):
+        from models import db, ChatMessage, ChatSession
+        try:
+            with self.app.app_context():
+                session = db.session.get(ChatSession, session_id)
+                if not session:
+                    return
+                stored_upto = session.summary_upto_id
+                upto = stored_upto or 0
+                previous = session.summary
+                query = ChatMessage.query.filter(ChatMessage.session_id == session_id, ChatMessage.id > upto)
+                if boundary:
+                    query = query.filter(ChatMessage.id < boundary)
+                rows = [(r.id, r.role, r.content) for r in query.order_by(ChatMessage.id.desc()).all()]
+            if not rows:
+                return
+
+            # Only the most recent unsummarized turns fit the summarizer's input; anything older is skipped
+            lines, used = [], 0
+            for _, role, content in rows:
+                used += estimate_tokens(content)
+                if lines and used > self.summary_input_tokens:
+                    break
+                lines.append(f"{role.upper()}: {content}")
+            summary = self.summarize(previous, "\n".join(reversed(lines)))
+            if not summary:
+                return
+
+            with self.app.app_context():
+                # Only apply if no other worker moved the summary forward meanwhile
+                ChatSession.query.filter_by(session_id=session_id, summary_upto_id=stored_upto).update(
+                    {ChatSession.summary: summary, ChatSession.summary_upto_id: rows[0][0]}, synchronize_session=False)
+                db.session.commit()
+        except Exception as e: print(f"Conversation summary failed for {session_id}: {e}")
+        finally:
+            with self.lock:
+                self.summarizing.discard(session_id)
+
+    def summarize(self, previous, transcript):
+        from liebe.orchestrator import orchestrator
+        prompt = f"""
+    Update the running summary of a conversation between the user and Liebe, their personal assistant.
+    Keep names, facts, preferences, decisions and open tasks; drop greetings and small talk.
+    Use plain text, at most {self.summary_words} words.
+
+    Current summary: {previous or "None yet."}
+
+    New turns:
+    {transcript}
+    """
+        text, service = orchestrator.chat(prompt, force_search=False, bypass_intent=True)
+        return text.strip() if service != "none" and text else None
+
+conversation_memory = ConversationMemory()
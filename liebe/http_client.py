@@ -0,0 +1,105 @@
+import os
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds. Chat tool profiles stay near the TOOL_TIMEOUT_* deadlines so calls a chat
+# turn has given up on end soon after instead of holding a tool worker
+TIMEOUT_PROFILES = {
+    "default": (3, 10),
+    "weather": (2, 3),
+    "search": (2, 4),
+    "youtube": (2, 4),
+    "openclaw": (3, 30),
+}
+
+
+class JitteredRetry(Retry):
+    """Retry with random jitter added to the backoff; urllib3 only has backoff_jitter from 2.0."""
+    backoff_jitter_max = 0.3
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, self.backoff_jitter_max) if backoff else backoff
+
+
+class HttpClient:
+    """
+    One keep-alive requests.Session shared by every outbound integration.
+    The adapter keeps a connection pool per host and retries idempotent calls with jittered backoff.
+    """
+    def __init__(self):
+        retry = JitteredRetry(
+            total=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=int(os.getenv("HTTP_POOL_HOSTS", "10")),
+            pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "10")),
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.stats = {}  # host -> counters
+        self.lock = threading.Lock()
+
+    def request(self, method, url, profile="default", **kwargs):
+        kwargs.setdefault("timeout", TIMEOUT_PROFILES.get(profile, TIMEOUT_PROFILES["default"]))
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+            self._record(host, time.perf_counter() - start, error=response.status_code >= 500)
+            return response
+        except Exception:
+            self._record(host, time.perf_counter() - start, error=True)
+            raise
+
+    def get(self, url, profile="default", **kwargs):
+        return self.request("GET", url, profile=profile, **kwargs)
+
+    def post(self, url, profile="default", **kwargs):
+        return self.request("POST", url, profile=profile, **kwargs)
+
+    def _record(self, host, elapsed, error=False):
+        with self.lock:
+            s = self.stats.setdefault(host, {"requests": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0})
+            s["requests"] += 1
+            s["errors"] += int(error)
+            s["total_latency"] += elapsed
+            s["max_latency"] = max(s["max_latency"], elapsed)
+
+    def get_stats(self):
+        # Connection reuse comes straight from urllib3's per-host pools
+        pools = {}
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None: continue
+            host = f"{pool.host}:{pool.port}" if pool.port not in (80, 443, None) else pool.host
+            pools[host] = {"connections_opened": pool.num_connections, "pool_requests": pool.num_requests}
+
+        report = {}
+        with self.lock:
+            for host, s in self.stats.items():
+                entry = {
+                    "requests": s["requests"],
+                    "errors": s["errors"],
+                    "avg_latency_ms": round(s["total_latency"] / s["requests"] * 1000, 1),
+                    "max_latency_ms": round(s["max_latency"] * 1000, 1),
+                }
+                pool = pools.get(host)
+                if pool:
+                    entry.update(pool)
+                    entry["connections_reused"] = max(pool["pool_requests"] - pool["connections_opened"], 0)
+                report[host] = entry
+        return report
+
+http_client = HttpClient()
@@ -0,0 +1,137 @@
+import os
+import re
+import glob
+import time
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from liebe.knowledge_index import knowledge_index, estimate_tokens
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".csv", ".json", ".log", ".py", ".js", ".html", ".xml", ".yaml", ".yml", ".ini", ".rst"}
+
+
+def extract_text(path, name, content_type=None):
+    """Returns the plain text of an uploaded file, or None if the type isn't supported."""
+    ext = os.path.splitext(name.lower())[1]
+    content_type = content_type or ""
+    if ext in TEXT_EXTENSIONS or content_type.startswith("text/"):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    if ext == ".pdf" or content_type == "application/pdf":
+        try:
+            from pypdf import PdfReader  # Imported here to keep it off the startup path
+        except ImportError:
+            print("PDF ingestion skipped: pypdf is not installed")
+            return None
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    if ext == ".docx":
+        with zipfile.ZipFile(path) as z:
+            xml = z.read("word/document.xml").decode("utf-8", errors="replace")
+        xml = re.sub(r"</w:p>", "\n", xml)
+        return re.sub(r"<[^>]+>", "", xml)
+    return None
+
+
+class DocumentIngestor:
+    """
+    Extracts text from uploaded attachments on a background worker and adds it to the knowledge index
+    under the source 'upload:<sha256>'. Extracted text is kept next to the upload store, so after a
+    restart documents are re-indexed from text without parsing the original files again; that runs on
+    the worker as soon as init_dir is called, and readers wait on the loaded event.
+    """
+    def __init__(self):
+        self.text_dir = None
+        self.executor = ThreadPoolExecutor(max_workers=int(os.getenv("INGEST_WORKERS", "1")), thread_name_prefix="liebe-ingest")
+        self.max_chars = int(os.getenv("INGEST_MAX_CHARS", "200000"))
+        self.wait_timeout = float(os.getenv("INGEST_WAIT", "3"))  # How long a chat turn waits for a fresh upload
+        self.status = {}   # digest -> pending | ready | unsupported | failed
+        self.futures = {}
+        self.loaded = threading.Event()
+        self.lock = threading.Lock()
+
+    def init_dir(self, upload_dir):
+        self.text_dir = os.path.join(upload_dir, "text")
+        os.makedirs(self.text_dir, exist_ok=True)
+        self.executor.submit(self._load)
+
+    @staticmethod
+    def source(digest):
+        return f"upload:{digest}"
+
+    def _text_path(self, digest):
+        return os.path.join(self.text_dir, f"{digest}.txt")
+
+    def _load(self):
+        # Index text extracted by earlier processes
+        try:
+            for path in glob.glob(os.path.join(self.text_dir, "*.txt")):
+                digest = os.path.basename(path)[:-4]
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        knowledge_index.add_document(self.source(digest), f.read())
+                    self.status[digest] = "ready"
+                except OSError: pass
+        finally:
+            self.loaded.set()
+
+    def submit(self, digest, path, name, content_type=None):
+        with self.lock:
+            if self.status.get(digest) in ("pending", "ready"):
+                return
+            self.status[digest] = "pending"
+            self.futures[digest] = self.executor.submit(self._ingest, digest, path, name, content_type)
+
+    def _ingest(self, digest, path, name, content_type):
+        try:
+            self.loaded.wait()
+            if self.status.get(digest) == "ready":
+                return  # Extracted by an earlier process and just re-indexed
+            text = extract_text(path, name, content_type)
+            if not text or not text.strip():
+                self.status[digest] = "unsupported"
+                return
+            text = text[:self.max_chars]
+            part = self._text_path(digest) + ".part"
+            with open(part, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(part, self._text_path(digest))
+            knowledge_index.add_document(self.source(digest), text)
+            self.status[digest] = "ready"
+        except Exception as e:
+            self.status[digest] = "failed"
+            print(f"Ingestion failed for {name}: {e}")
+        finally:
+            with self.lock:
+                self.futures.pop(digest, None)
+
+    def wait(self, digest, timeout=None):
+        # One deadline for the startup re-index and this document's own ingestion
+        deadline = time.time() + (timeout or self.wait_timeout)
+        self.loaded.wait(timeout or self.wait_timeout)
+        with self.lock:
+            future = self.futures.get(digest)
+        if future:
+            try:
+                future.result(timeout=max(0, deadline - time.time()))
+            except Exception: pass
+        return self.status.get(digest)
+
+    def context(self, digest, query, token_budget=None):
+        """Passages of an attachment relevant to query; falls back to its opening when nothing matches."""
+        if self.wait(digest) != "ready":
+            return ""
+        token_budget = token_budget or int(os.getenv("INGEST_TOKEN_BUDGET", "800"))
+        source = self.source(digest)
+        context = knowledge_index.get_context(query, token_budget=token_budget, sources={source})
+        if context:
+            return context
+        # "Summarise this" shares no terms with the document, so send its beginning instead
+        passages, used = [], 0
+        for text in knowledge_index.passages(source):
+            used += estimate_tokens(text)
+            if used > token_budget:
+                break
+            passages.append(text)
+        return "\n---\n".join(passages)
+
+document_ingestor = DocumentIngestor()
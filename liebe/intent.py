@@ -0,0 +1,107 @@
+import re
+
+GREETINGS = ["hi", "hello", "hey", "hola", "yo", "hi liebe", "hello liebe", "hey liebe", "yo liebe"]
+
+# Keyword groups; a message belongs to a group when any keyword occurs as a substring
+KEYWORD_GROUPS = {
+    "greeting_prefix": ["hi ", "hello ", "hey ", "yo "],
+    "starter": ["how are you", "what's up", "good morning", "good evening", "good night", "thanks", "thank you", "nice to meet you"],
+    "tool": ["weather", "time", "alarm", "news", "note", "search", "find", "tutorial", "video", "save", "remind"],
+    "search": [
+        "search", "find", "latest", "price", "stock", "what is the status",
+        "details about", "cource", "course", "syllabus", "news in", "events",
+        "scenario", "update on"
+    ],
+    "news": ["news", "headline", "breaking"],
+    "weather": ["weather", "temperature", "forecast", "climate"],
+    "video": ["tutorial", "learn", "how to", "course video", "suggest youtube", "watch video"],
+    "alarm": ["alarm", "wake me up", "timer"],
+    "note": ["remind", "save", "note", "task", "remember", "write", "assignment", "deadline", "todo", "project", "meeting", "appointment", "submit"],
+    "security": ["nmap", "scan", "vulnerability", "hack", "penetration", "exploit", "kali", "security tools", "ports"],
+    "local": ["local", "ollama"],
+    "reasoning": ["think", "reason", "math", "logic", "complex", "why"],
+    "code": ["code", "program", "python"],
+}
+
+
+def _trie_pattern(words):
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Greedy optional keeps the longest keyword at this position
+            body = ("(?:" + body + ")" if len(branches) == 1 else body) + "?"
+        return body
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """
+    Matches every keyword group in a single regex pass.
+    The pattern is a prefix trie inside a lookahead, so overlapping keywords are still seen; at each
+    position the longest keyword matches and the groups of all its prefix keywords are credited too.
+    """
+    def __init__(self, groups=KEYWORD_GROUPS):
+        keywords = {}
+        for group, words in groups.items():
+            for w in words:
+                keywords.setdefault(w, set()).add(group)
+        self.hits_for = {
+            w: frozenset().union(*(keywords[p] for p in keywords if w.startswith(p)))
+            for w in keywords
+        }
+        self.pattern = re.compile("(?=(" + _trie_pattern(keywords) + "))")
+        self.greetings = frozenset(GREETINGS)
+
+    def match_groups(self, msg):
+        found = set()
+        hits_for = self.hits_for
+        for m in self.pattern.finditer(msg):
+            found |= hits_for[m.group(1)]
+        return found
+
+    def classify(self, user_message):
+        msg = user_message.lower().strip()
+        found = self.match_groups(msg)
+
+        is_basic = msg in self.greetings or "starter" in found or (len(msg.split()) <= 3 and "tool" not in found)
+        is_greeting = is_basic and (msg in self.greetings or "greeting_prefix" in found)
+
+        info = {
+            "needs_search": "search" in found and not is_basic,
+            "is_news_search": "news" in found,
+            "is_weather": "weather" in found,
+            "is_video": "video" in found,
+            "is_alarm": "alarm" in found,
+            "is_note": "note" in found,
+            "is_security": "security" in found,
+            "is_basic": is_basic,
+            "is_greeting": is_greeting,
+            "selected_service": "gemini" # Default
+        }
+
+        if info["is_security"]:
+            info["selected_service"] = "openclaw"
+        elif "local" in found:
+            info["selected_service"] = "ollama"
+        elif "reasoning" in found:
+            info["selected_service"] = "groq_r1"
+        elif "code" in found:
+            info["selected_service"] = "groq"
+        return info
+
+    def classify_many(self, messages):
+        classify = self.classify
+        return [classify(m) for m in messages]
+
+intent_matcher = IntentMatcher()
@@ -0,0 +1,146 @@
+import os
+import re
+import glob
+import math
+import time
+import threading
+from collections import Counter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Common words that carry no retrieval signal
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "will", "with", "you", "your"
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    # Rough LLM token estimate (~4 chars per token), good enough for budgeting
+    return len(text) // 4 + 1
+
+
+class KnowledgeIndex:
+    """
+    Incremental BM25 index over knowledge_base/*.txt.
+    Files are split into overlapping word chunks and only re-indexed when their mtime changes.
+    """
+    def __init__(self, kb_dir=None, chunk_words=None, overlap=20, k1=1.5, b=0.75):
+        self.kb_dir = kb_dir or os.path.join(ROOT_DIR, "knowledge_base")
+        self.chunk_words = chunk_words or int(os.getenv("KB_CHUNK_WORDS", "120"))
+        self.overlap = overlap
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval = float(os.getenv("KB_REFRESH_INTERVAL", "5"))
+
+        self.mtimes = {}     # file path -> mtime it was indexed at
+        self.chunks = {}     # source -> [(text, term_counts, length)]
+        self.df = Counter()  # term -> number of chunks containing it
+        self.n_chunks = 0
+        self.total_len = 0
+        self.last_scan = 0
+        self.lock = threading.Lock()
+
+    def _chunk(self, text):
+        words = text.split()
+        if not words:
+            return []
+        step = max(self.chunk_words - self.overlap, 1)
+        return [" ".join(words[i:i + self.chunk_words]) for i in range(0, max(len(words) - self.overlap, 1), step)]
+
+    def add_document(self, source, text):
+        with self.lock:
+            self._remove(source)
+            entries = []
+            for chunk in self._chunk(text):
+                counts = Counter(tokenize(chunk))
+                length = sum(counts.values())
+                self.df.update(counts.keys())
+                self.total_len += length
+                entries.append((chunk, counts, length))
+            self.chunks[source] = entries
+            self.n_chunks += len(entries)
+
+    def remove_document(self, source):
+        with self.lock:
+            self._remove(source)
+
+    def _remove(self, source):
+        for _, counts, length in self.chunks.pop(source, []):
+            self.df.subtract(counts.keys())
+            self.total_len -= length
+            self.n_chunks -= 1
+        self.df += Counter()  # drop zero counts
+
+    def refresh(self, force=False):
+        if not force and time.time() - self.last_scan < self.refresh_interval:
+            return
+        self.last_scan = time.time()
+
+        seen = set()
+        for f_path in glob.glob(os.path.join(self.kb_dir, "*.txt")):
+            seen.add(f_path)
+            try:
+                mtime = os.path.getmtime(f_path)
+                if self.mtimes.get(f_path) == mtime:
+                    continue
+                with open(f_path, "r", encoding="utf-8") as f:
+                    self.add_document(f_path, f.read())
+                self.mtimes[f_path] = mtime
+            except Exception: pass
+
+        for f_path in list(self.mtimes):
+            if f_path not in seen:
+                self.remove_document(f_path)
+                del self.mtimes[f_path]
+
+    def search(self, query, top_k=4, sources=None):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self.lock:
+            if not self.n_chunks:
+                return []
+            avg_len = self.total_len / self.n_chunks
+            idf = {t: math.log(1 + (self.n_chunks - self.df[t] + 0.5) / (self.df[t] + 0.5)) for t in terms if self.df[t]}
+            scored = []
+            for source, entries in self.chunks.items():
+                if sources is not None and source not in sources:
+                    continue
+                for text, counts, length in entries:
+                    score = 0.0
+                    for t, w in idf.items():
+                        tf = counts.get(t)
+                        if tf:
+                            score += w * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+                    if score > 0:
+                        scored.append((score, text))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [text for _, text in scored[:top_k]]
+
+    def passages(self, source):
+        with self.lock:
+            return [text for text, _, _ in self.chunks.get(source, [])]
+
+    def get_context(self, query, top_k=None, token_budget=None, sources=None):
+        """Returns the most relevant passages for query, trimmed to fit token_budget."""
+        top_k = top_k or int(os.getenv("KB_TOP_K", "4"))
+        token_budget = token_budget or int(os.getenv("KB_TOKEN_BUDGET", "500"))
+        self.refresh()
+
+        passages, used = [], 0
+        for text in self.search(query, top_k=top_k, sources=sources):
+            cost = estimate_tokens(text)
+            if used + cost > token_budget:
+                continue
+            passages.append(text)
+            used += cost
+        return "\n---\n".join(passages)
+
+knowledge_index = KnowledgeIndex()
@@ -0,0 +1,95 @@
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    """Prometheus-style histogram with cumulative buckets per label set."""
+    def __init__(self, name, help_text, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            series = self.series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self.series.items())
+        for key, (counts, total, count) in items:
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key))
+            sep = "," if labels else ""
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {c}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return "\n".join(lines)
+
+
+class Trace:
+    """
+    Stage timings for one operation (a chat turn, a briefing, a TTS request).
+    Every stage is observed into liebe_stage_seconds and kept in timings (ms) for the
+    Server-Timing header or the final SSE event.
+    """
+    def __init__(self, registry, operation):
+        self.registry = registry
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.finished = False
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        self.timings[stage] = round(self.timings.get(stage, 0) + seconds * 1000, 1)
+        self.registry.stage_seconds.observe(seconds, operation=self.operation, stage=stage)
+
+    def finish(self, status="ok"):
+        if not self.finished:
+            self.finished = True
+            total = time.perf_counter() - self.started
+            self.timings["total"] = round(total * 1000, 1)
+            self.registry.request_seconds.observe(total, operation=self.operation, status=status)
+        return self.timings
+
+    def server_timing(self):
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.timings.items())
+
+
+class Metrics:
+    def __init__(self):
+        self.stage_seconds = Histogram("liebe_stage_seconds", "Time spent in each stage of an operation.", ("operation", "stage"))
+        self.request_seconds = Histogram("liebe_request_seconds", "End-to-end time of an operation.", ("operation", "status"))
+
+    def trace(self, operation):
+        return Trace(self, operation)
+
+    def render(self):
+        return "\n".join(h.render() for h in (self.stage_seconds, self.request_seconds)) + "\n"
+
+metrics = Metrics()
@@ -1,37 +1,105 @@
 import os
 import json
-import glob
 import time
-import re
-import requests
-from ddgs import DDGS
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-from google import genai
-from groq import Groq
-import ollama
 from liebe.youtube_manager import youtube_manager
+from liebe.knowledge_index import knowledge_index
+from liebe.weather import fetch_weather, normalize_city
+from liebe.cache import TTLCache
+from liebe.http_client import http_client, TIMEOUT_PROFILES
+from liebe.intent import intent_matcher
+from liebe.conversation import conversation_memory
+from liebe.router import provider_router, RouterError
+from liebe.metrics import metrics
+from liebe.uploads import upload_store
+from liebe.ingest import document_ingestor
 
 # Load environment variables early
 load_dotenv()
 
 class LiebeOrchestrator:
     def __init__(self):
-        self.kb_cache = None
-        self.kb_last_load = 0
+        self.tool_timeouts = {
+            "weather": float(os.getenv("TOOL_TIMEOUT_WEATHER", "3")),
+            "search": float(os.getenv("TOOL_TIMEOUT_SEARCH", "5")),
+            "video": float(os.getenv("TOOL_TIMEOUT_VIDEO", "5")),
+        }
+        # One bounded pool per context provider so a burst of slow searches can't starve weather or YouTube.
+        # A call that misses its deadline keeps its worker until its own network timeout (http_client profiles) ends it
+        self.tool_executors = {
+            name: ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_WORKERS", "4")), thread_name_prefix=f"liebe-tool-{name}")
+            for name in self.tool_timeouts
+        }
+        # Shared by /api/weather, /api/morning_briefing and chat; stale entries are served while refreshing
+        self.weather_cache = TTLCache(
+            ttl=float(os.getenv("WEATHER_TTL", "600")),
+            stale_ttl=float(os.getenv("WEATHER_STALE_TTL", "3600")),
+            name="weather"
+        )
+        # Identical queries (e.g. the daily briefing's news search) share one DDGS call
+        self.search_cache = TTLCache(ttl=float(os.getenv("SEARCH_TTL", "300")), name="search")
+        # Short/basic messages go to a warmed local Ollama model when OLLAMA_LOCAL_TIER=1 (opt-in)
+        self.local_tier = os.getenv("OLLAMA_LOCAL_TIER", "0") == "1"
+        self.local_max_words = int(os.getenv("OLLAMA_LOCAL_MAX_WORDS", "12"))
+        self.ollama_ready = False
+        self.client_lock = threading.Lock()
         self._initialize_clients()
 
+        # Streaming providers behind the latency-aware router; stubs can be registered the same way
+        # Availability only checks configuration so routing never forces an SDK import
+        self.router = provider_router
+        self.router.register("gemini", self._stream_gemini, available=lambda: bool(self.gemini_key or self._clients.get("gemini")))
+        self.router.register("groq", lambda *a: self._stream_groq(self.model_groq_id, *a), available=lambda: bool(self.groq_key or self._clients.get("groq")))
+        self.router.register("groq_r1", lambda *a: self._stream_groq(self.model_r1_id, *a), available=lambda: bool(self.groq_key or self._clients.get("groq")))
+        # The host has a localhost default, so only an explicit OLLAMA_HOST or a successful warm-up counts
+        self.router.register("ollama", self._stream_ollama, available=lambda: self.ollama_configured or self.ollama_ready)
+
+    def warm_ollama(self, background=True):
+        """Loads the local model into memory so the first local reply doesn't pay the load time."""
+        def warm():
+            try:
+                if not self.ollama_client:
+                    return
+                # An empty prompt only loads the model; keep_alive keeps it resident afterwards
+                self.ollama_client.generate(model=self.model_ollama_id, prompt="", keep_alive=self.ollama_keep_alive)
+                self.ollama_ready = True
+                print(f"Ollama model {self.model_ollama_id} warmed up")
+            except Exception as e:
+                self.ollama_ready = False
+                print(f"Ollama warm-up skipped: {e}")
+
+        if background:
+            threading.Thread(target=warm, name="liebe-ollama-warmup", daemon=True).start()
+        else:
+            warm()
+
+    def _select_service(self, intent, user_message, contexts):
+        service = intent["selected_service"]
+        # Local tier: no network round trip for small talk and short questions that need no tool context.
+        # Alarm/note replies must emit the [ALARM:..]/[NOTE:..] tags the client parses, so they stay on Gemini
+        if (service == "gemini" and self.local_tier and self.ollama_ready and not contexts
+                and not intent["is_alarm"] and not intent["is_note"]
+                and (intent["is_basic"] or len(user_message.split()) <= self.local_max_words)):
+            return "ollama"
+        return service
+
     def _initialize_clients(self, force=False):
-        if hasattr(self, 'gemini_client') and self.gemini_client and not force:
+        # Only reads configuration; the SDKs are imported and their clients built on first use
+        if getattr(self, "_clients", None) is not None and not force:
             return
             
         self.gemini_key = os.getenv("GEMINI_API_KEY")
         self.groq_key = os.getenv("GROQ_API_KEY")
         self.ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        self.ollama_configured = bool(os.getenv("OLLAMA_HOST"))
         
         # Models
         self.model_gemini_id = os.getenv("MODEL_GEMINI", "gemini-1.5-flash")
         self.model_groq_id = os.getenv("MODEL_GROQ", "llama-3.3-70b-versatile")
         self.model_ollama_id = os.getenv("MODEL_OLLAMA", "llama3")
+        self.ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # How long Ollama keeps the weights loaded
         self.model_r1_id = "deepseek-r1-distill-llama-70b" 
 
         # OpenClaw Settings
@@ -40,61 +108,90 @@ class LiebeOrchestrator:
         self.openclaw_port = os.getenv("OPENCLAW_PORT", "9876")
         self.openclaw_url = f"http://{self.openclaw_ip}:{self.openclaw_port}" if self.openclaw_ip else None
 
+        self._clients = {}
+
+    def _client(self, name, build):
+        client = self._clients.get(name)
+        if client is None:
+            with self.client_lock:
+                client = self._clients.get(name)
+                if client is None:
+                    try:
+                        client = build()
+                        if client is not None:
+                            self._clients[name] = client
+                    except Exception as e: print(f"{name} client unavailable: {e}")
+        return client
+
+    def _build_gemini(self):
         # Gemini (Using new google.genai Client)
-        try:
-            if self.gemini_key:
-                self.gemini_client = genai.Client(api_key=self.gemini_key)
-        except Exception: self.gemini_client = None
+        if not self.gemini_key: return None
+        from google import genai
+        return genai.Client(api_key=self.gemini_key)
 
-        # Groq
-        try:
-            if self.groq_key:
-                self.groq_client = Groq(api_key=self.groq_key)
-        except Exception: self.groq_client = None
+    def _build_groq(self):
+        if not self.groq_key: return None
+        from groq import Groq
+        return Groq(api_key=self.groq_key)
+
+    def _build_ollama(self):
+        import ollama
+        return ollama.Client(host=self.ollama_host)
+
+    @property
+    def gemini_client(self):
+        return self._client("gemini", self._build_gemini)
 
-        # Ollama
+    @gemini_client.setter
+    def gemini_client(self, client):
+        self._clients["gemini"] = client
+
+    @property
+    def groq_client(self):
+        return self._client("groq", self._build_groq)
+
+    @groq_client.setter
+    def groq_client(self, client):
+        self._clients["groq"] = client
+
+    @property
+    def ollama_client(self):
+        return self._client("ollama", self._build_ollama)
+
+    @ollama_client.setter
+    def ollama_client(self, client):
+        self._clients["ollama"] = client
+
+    def get_knowledge_base(self, query):
+        # Only the passages relevant to this message, capped by KB_TOKEN_BUDGET
         try:
-            self.ollama_client = ollama.Client(host=self.ollama_host)
-        except Exception: self.ollama_client = None
-
-    def get_knowledge_base(self):
-        if self.kb_cache and time.time() - self.kb_last_load < 300: # Cache for 5 mins
-            return self.kb_cache
-        kb_content = ""
-        for f_path in glob.glob("knowledge_base/*.txt"):
-            try:
-                with open(f_path, "r", encoding="utf-8") as f:
-                    kb_content += f.read() + "\n"
-            except Exception: pass
-        self.kb_cache = kb_content
-        self.kb_last_load = time.time()
-        return kb_content
+            return knowledge_index.get_context(query)
+        except Exception: return ""
         
+    def get_weather_report(self, query):
+        city = normalize_city(query)
+        return self.weather_cache.get_or_load(" ".join(city.lower().split()), lambda: fetch_weather(city), should_cache=lambda r: r.ok)
+
     def get_weather(self, query):
-        import requests
-        api_key = os.getenv("OPENWEATHER_API_KEY")
-        if not api_key: return "WEATHER ERROR: Missing key."
-        city = re.sub(r"weather|in|at|of|whats|the|today's|todays", "", query.lower()).strip("? .!,\"").strip().title() or "Mumbai"
-        try:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-            data = requests.get(url, timeout=3).json()
-            if data.get("cod") != 200: return f"Weather data not found for {city}."
-            temp = data["main"]["temp"]
-            desc = data["weather"][0]["description"].capitalize()
-            humidity = data["main"]["humidity"]
-            wind = data["wind"]["speed"]
-            return f"### Weather in {city}\n**Temperature:** {round(temp, 1)}°C\n**Conditions:** {desc}\n**Humidity:** {humidity}%\n**Wind Speed:** {wind} m/s"
-        except Exception as e: return f"Weather error: {str(e)}"
+        return self.get_weather_report(query).to_markdown()
 
     def search_web(self, query, search_type="text"):
+        key = (" ".join(query.lower().split()), search_type)
+        return self.search_cache.get_or_load(key, lambda: self._search_web(query, search_type),
+                                             should_cache=lambda r: r != "Search failed.")
+
+    def _search_web(self, query, search_type="text"):
         from ddgs import DDGS
         try:
-            with DDGS() as ddgs:
+            with DDGS(timeout=TIMEOUT_PROFILES["search"][1]) as ddgs:
                 results = ddgs.news(query, max_results=3) if search_type == "news" else ddgs.text(query, max_results=3)
                 if not results: return "No results."
                 return "### Search Results\n" + "\n".join([f"- {r.get('title')}: {r.get('body')[:100]}..." for r in results])
         except Exception: return "Search failed."
 
+    def get_cache_stats(self):
+        return {cache.name: dict(cache.stats) for cache in (self.weather_cache, self.search_cache)}
+
     def get_youtube_recommendations(self, query="trending"):
         try:
             return youtube_manager.get_video_suggestions(query)
@@ -109,53 +206,11 @@ class LiebeOrchestrator:
         return query.strip("? .!,\"").strip()
 
     def analyze_intent(self, user_message):
-        msg = user_message.lower().strip()
-        
-        # 1. Fast Path: Basic Greetings & Short Messages
-        greetings = ["hi", "hello", "hey", "hola", "yo", "hi liebe", "hello liebe", "hey liebe", "yo liebe"]
-        words = msg.split()
-        
-        # Determine if it's a basic conversation without any need for tools
-        conversational_starters = ["how are you", "what's up", "good morning", "good evening", "good night", "thanks", "thank you", "nice to meet you"]
-        is_basic = any(g == msg for g in greetings) or any(s in msg for s in conversational_starters) or (len(words) <= 3 and not any(k in msg for k in ["weather", "time", "alarm", "news", "note", "search", "find", "tutorial", "video", "save", "remind"]))
-        is_greeting = is_basic and (msg in greetings or any(g in msg for g in ["hi ", "hello ", "hey ", "yo "]))
-        
-        search_keywords = [
-            "search", "find", "latest", "price", "stock", "what is the status", 
-            "details about", "cource", "course", "syllabus", "news in", "events", 
-            "scenario", "update on"
-        ]
-        news_keywords = ["news", "headline", "breaking"]
-        weather_keywords = ["weather", "temperature", "forecast", "climate"]
-        video_keywords = ["tutorial", "learn", "how to", "course video", "suggest youtube", "watch video"]
-        
-        security_keywords = ["nmap", "scan", "vulnerability", "hack", "penetration", "exploit", "kali", "security tools", "ports"]
-        
-        info = {
-            "needs_search": any(k in msg for k in search_keywords) and not is_basic,
-            "is_news_search": any(k in msg for k in news_keywords),
-            "is_weather": any(k in msg for k in weather_keywords),
-            "is_video": any(k in msg for k in video_keywords),
-            "is_alarm": any(k in msg for k in ["alarm", "wake me up", "timer"]),
-            "is_note": any(k in msg for k in ["remind", "save", "note", "task", "remember", "write", "assignment", "deadline", "todo", "project", "meeting", "appointment", "submit"]),
-            "is_security": any(k in msg for k in security_keywords),
-            "is_basic": is_basic,
-            "is_greeting": is_greeting,
-            "selected_service": "gemini" # Default
-        }
+        # All keyword groups are matched in one pass by the precompiled IntentMatcher
+        return intent_matcher.classify(user_message)
 
-        # Stricter search override (only if not basic conversation)
-        # Route logic
-        if info["is_security"]:
-            info["selected_service"] = "openclaw"
-        elif "local" in msg or "ollama" in msg:
-            info["selected_service"] = "ollama"
-        elif any(k in msg for k in ["think", "reason", "math", "logic", "complex", "why"]):
-            info["selected_service"] = "groq_r1"
-        elif any(k in msg for k in ["code", "program", "python"]):
-            info["selected_service"] = "groq"
-            
-        return info
+    def analyze_intents(self, messages):
+        return intent_matcher.classify_many(messages)
 
     def _call_openclaw(self, prompt):
         if not self.openclaw_url or not self.openclaw_token:
@@ -166,7 +221,7 @@ class LiebeOrchestrator:
             headers = {"Authorization": f"Bearer {self.openclaw_token}", "Content-Type": "application/json"}
             payload = {"prompt": prompt}
             
-            response = requests.post(f"{self.openclaw_url}/api/acp/v1/execute", json=payload, headers=headers, timeout=30)
+            response = http_client.post(f"{self.openclaw_url}/api/acp/v1/execute", profile="openclaw", json=payload, headers=headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -176,82 +231,153 @@ class LiebeOrchestrator:
         except Exception as e:
             return f"### ❌ Connection Failed\nCould not reach Kali Linux at {self.openclaw_ip}. Make sure the VM is running and OpenClaw is active."
 
-    def chat_stream(self, user_message, history=None, force_search=False, force_deep_thinking=False):
-        yield json.dumps({"status": "progress", "message": "🧿 Analyzing intent..."})
-        intent = self.analyze_intent(user_message)
-        if force_search: intent["needs_search"] = True
-        if force_deep_thinking: intent["selected_service"] = "groq_r1"
+    def _format_videos(self, yt):
+        if "videos" not in yt: return None
+        return "### VIDEOS\n" + "\n".join([f"- {v['title']}: {v['url']}" for v in yt["videos"]])
 
-        contexts = []
+    def _gather_contexts(self, user_message, intent, trace=None):
+        """
+        Runs the context providers the intent needs concurrently, yielding progress events as each
+        one finishes. Providers that miss their deadline are dropped; returns contexts in a stable order.
+        """
+        tools = []
         if intent["is_weather"]:
-            yield json.dumps({"status": "progress", "message": "🌦️ Fetching weather..."})
-            contexts.append(self.get_weather(user_message))
-        
+            tools.append(("weather", "🌦️ Fetching weather...", "🌦️ Weather ready", self.get_weather))
         if intent["needs_search"]:
-            yield json.dumps({"status": "progress", "message": "🌐 Searching..."})
-            contexts.append(self.search_web(user_message))
+            tools.append(("search", "🌐 Searching...", "🌐 Search results ready", self.search_web))
+        if intent["is_video"]:
+            tools.append(("video", "🎥 Searching YouTube...", "🎥 Videos ready",
+                          lambda q: self._format_videos(self.get_youtube_recommendations(q))))
+        if not tools:
+            return []
+
+        start = time.time()
+        futures = {}
+        for name, start_msg, done_msg, fn in tools:
+            fut = self.tool_executors[name].submit(fn, user_message)
+            futures[fut] = (name, done_msg, start + self.tool_timeouts.get(name, 5))
+        for _, start_msg, _, _ in tools:
+            yield json.dumps({"status": "progress", "message": start_msg})
+
+        results = {}
+        pending = set(futures)
+        while pending:
+            next_deadline = min(futures[f][2] for f in pending)
+            done, pending = wait(pending, timeout=max(next_deadline - time.time(), 0), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, done_msg, _ = futures[fut]
+                if trace: trace.record(name, time.time() - start)
+                try:
+                    results[name] = fut.result()
+                    yield json.dumps({"status": "progress", "message": done_msg})
+                except Exception as e: print(f"Tool {name} failed: {e}")
+            now = time.time()
+            for fut in [f for f in pending if futures[f][2] <= now]:
+                # Late providers no longer hold up the LLM call; cancel() only helps if it hasn't started,
+                # otherwise the call's own network timeout frees the worker shortly after
+                fut.cancel()
+                pending.discard(fut)
+                if trace: trace.record(f"{futures[fut][0]}_timeout", now - start)
+                print(f"Tool {futures[fut][0]} timed out")
+
+        return [results[name] for name, *_ in tools if results.get(name)]
+
+    def chat_stream(self, user_message, history=None, force_search=False, force_deep_thinking=False, session_id=None, attachment=None):
+        # Per-stage timings go to /metrics and ride along on the final 'done' event
+        trace = metrics.trace("chat_stream")
+        try:
+            yield from self._chat_stream(trace, user_message, history, force_search, force_deep_thinking, session_id, attachment)
+        finally:
+            trace.finish(status="aborted")  # No-op unless the client went away mid-stream
+
+    def _chat_stream(self, trace, user_message, history, force_search, force_deep_thinking, session_id, attachment):
+        yield json.dumps({"status": "progress", "message": "🧿 Analyzing intent..."})
+        with trace.span("intent"):
+            intent = self.analyze_intent(user_message)
+        if force_search: intent["needs_search"] = True
+        if force_deep_thinking: intent["selected_service"] = "groq_r1"
 
         if intent["selected_service"] == "openclaw":
             yield json.dumps({"status": "progress", "message": "🛡️ Querying Kali OpenClaw..."})
-            res = self._call_openclaw(user_message)
-            yield json.dumps({"status": "done", "full_text": res, "service": "openclaw"})
+            with trace.span("openclaw"):
+                res = self._call_openclaw(user_message)
+            yield json.dumps({"status": "done", "full_text": res, "service": "openclaw", "timings": trace.finish()})
             return
 
-        if intent["is_video"]:
-            yield json.dumps({"status": "progress", "message": "🎥 Searching YouTube..."})
-            yt = self.get_youtube_recommendations(user_message)
-            if "videos" in yt:
-                contexts.append("### VIDEOS\n" + "\n".join([f"- {v['title']}: {v['url']}" for v in yt["videos"]]))
+        with trace.span("tools"):
+            contexts = yield from self._gather_contexts(user_message, intent, trace)
 
-        kb = self.get_knowledge_base()
+        with trace.span("knowledge_base"):
+            kb = self.get_knowledge_base(user_message)
         now = time.strftime('%a %b %d %Y')
         curr_time = time.strftime('%H:%M')
         
         sys_msg = f"You are Liebe, a personal assistant. Current Date: {now}, Time: {curr_time}. Be brief."
         if kb: sys_msg += f"\nKnowledge: {kb}"
+        upload = upload_store.parse_url(attachment)
+        if upload:
+            # Extracted text of the file sent with this message (later turns find it through the knowledge base)
+            with trace.span("attachment"):
+                doc = document_ingestor.context(upload[0], user_message)
+            if doc: sys_msg += f"\nAttached file ({upload[1]}): {doc}"
         if contexts: sys_msg += f"\nContext: {' '.join(contexts)}"
         if intent["is_alarm"]: sys_msg += "\nEnd with [ALARM:HH:MM] or [TIMER:MM] if requested."
         if intent["is_note"]: sys_msg += f"\nTo save a note for a specific date (calculate tomorrow/next week if needed based on {now}), end with: [NOTE:Description|DateString]."
 
+        # Persisted turns within CONTEXT_TOKEN_BUDGET plus a rolling summary of older ones
+        summary = None
+        if session_id:
+            try:
+                with trace.span("history"):
+                    summary, history = conversation_memory.build(session_id, current=user_message)
+            except Exception as e: print(f"Conversation context error: {e}")
+        elif history:
+            history = history[-3:]
+        history = history or []
+        if summary: sys_msg += f"\nEarlier in this conversation: {summary}"
+
         yield json.dumps({"status": "progress", "message": "🧠 Thinking..."})
         
-        service = intent["selected_service"]
+        service = self._select_service(intent, user_message, contexts)
+        full_text = ""
+        started = time.perf_counter()
         try:
-            full_prompt = f"SYSTEM: {sys_msg}\n"
-            if history:
-                for h in history[-3:]: full_prompt += f"{h['role'].upper()}: {h['content']}\n"
-            full_prompt += f"USER: {user_message}"
-
-            # Fast Stream (Gemini)
-            if service == "gemini" and self.gemini_client:
-                full_text = ""
-                for chunk in self.gemini_client.models.generate_content_stream(model=self.model_gemini_id, contents=full_prompt):
-                    if chunk.text:
-                        full_text += chunk.text
-                        yield json.dumps({"status": "chunk", "text": chunk.text, "service": "gemini"})
-                yield json.dumps({"status": "done", "full_text": full_text, "service": "gemini"})
-                return
-
-            # Groq (Reasoning or Default)
-            if ("groq" in service or force_deep_thinking) and self.groq_client:
-                model = self.model_r1_id if service == "groq_r1" else self.model_groq_id
-                response = self.groq_client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "system", "content": sys_msg}, {"role": "user", "content": user_message}],
-                    stream=True
-                )
-                full_text = ""
-                for chunk in response:
-                    content = chunk.choices[0].delta.content or ""
-                    if content:
-                        full_text += content
-                        yield json.dumps({"status": "chunk", "text": content, "service": "groq"})
-                yield json.dumps({"status": "done", "full_text": full_text, "service": "groq"})
-                return
-
-            yield json.dumps({"status": "error", "message": "AI Service not available."})
-        except Exception as e:
-            yield json.dumps({"status": "error", "message": f"Generation failed: {str(e)}"})
+            for provider, text in self.router.stream(service, sys_msg, history, user_message):
+                if not full_text: trace.record("first_token", time.perf_counter() - started)
+                service = "groq" if provider.startswith("groq") else provider
+                full_text += text
+                yield json.dumps({"status": "chunk", "text": text, "service": service})
+            trace.record("generation", time.perf_counter() - started)
+            yield json.dumps({"status": "done", "full_text": full_text, "service": service, "timings": trace.finish()})
+        except RouterError as e:
+            trace.finish(status="error")
+            yield json.dumps({"status": "error", "message": str(e)})
+
+    def _stream_gemini(self, sys_msg, history, user_message):
+        full_prompt = f"SYSTEM: {sys_msg}\n"
+        for h in history: full_prompt += f"{h['role'].upper()}: {h['content']}\n"
+        full_prompt += f"USER: {user_message}"
+        for chunk in self.gemini_client.models.generate_content_stream(model=self.model_gemini_id, contents=full_prompt):
+            if chunk.text:
+                yield chunk.text
+
+    def _stream_groq(self, model, sys_msg, history, user_message):
+        response = self.groq_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": sys_msg}] + history + [{"role": "user", "content": user_message}],
+            stream=True
+        )
+        for chunk in response:
+            content = chunk.choices[0].delta.content or ""
+            if content:
+                yield content
+
+    def _stream_ollama(self, sys_msg, history, user_message):
+        messages = [{"role": "system", "content": sys_msg}] + history + [{"role": "user", "content": user_message}]
+        for chunk in self.ollama_client.chat(model=self.model_ollama_id, messages=messages, stream=True, keep_alive=self.ollama_keep_alive):
+            content = chunk['message']['content']
+            if content:
+                yield content
 
     def _call_gemini(self, system_prompt, messages):
         full_prompt = f"SYSTEM: {system_prompt}\n\n"
@@ -274,20 +400,28 @@ class LiebeOrchestrator:
         options = {}
         if max_tokens:
             options["num_predict"] = max_tokens
-        response = self.ollama_client.chat(model=self.model_ollama_id, messages=ollama_messages, options=options)
+        response = self.ollama_client.chat(model=self.model_ollama_id, messages=ollama_messages, options=options, keep_alive=self.ollama_keep_alive)
         return response['message']['content']
 
-    def chat(self, user_message, history=None, force_search=False, force_deep_thinking=False, bypass_intent=False):
-        # Helper for non-streaming calls (like briefings)
+    def chat(self, user_message, history=None, force_search=False, force_deep_thinking=False, bypass_intent=False, trace=None):
+        # Helper for non-streaming calls (like briefings); callers may pass their own trace
+        own_trace = trace is None
+        trace = trace or metrics.trace("chat")
         self._initialize_clients()
         
         contexts = []
         if not bypass_intent:
-            intent = self.analyze_intent(user_message)
-            if intent["is_weather"]: contexts.append(self.get_weather(user_message))
-            if intent["needs_search"]: contexts.append(self.search_web(user_message))
+            with trace.span("intent"):
+                intent = self.analyze_intent(user_message)
+            if intent["is_weather"]:
+                with trace.span("weather"):
+                    contexts.append(self.get_weather(user_message))
+            if intent["needs_search"]:
+                with trace.span("search"):
+                    contexts.append(self.search_web(user_message))
         
-        kb = self.get_knowledge_base()
+        with trace.span("knowledge_base"):
+            kb = self.get_knowledge_base(user_message)
         now_date = time.strftime('%a %b %d %Y')
         curr_time = time.strftime('%H:%M')
         sys_msg = f"You are Liebe. Current Date: {now_date}, Time: {curr_time}. brief."
@@ -300,9 +434,12 @@ class LiebeOrchestrator:
         prompt += f"USER: {user_message}"
 
         try:
-            response = self.gemini_client.models.generate_content(model=self.model_gemini_id, contents=prompt)
+            with trace.span("generation"):
+                response = self.gemini_client.models.generate_content(model=self.model_gemini_id, contents=prompt)
+            if own_trace: trace.finish()
             return response.text, "gemini"
         except Exception as e:
+            if own_trace: trace.finish(status="error")
             return f"Error: {str(e)}", "none"
 
 orchestrator = LiebeOrchestrator()
@@ -0,0 +1,253 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+
+
+class RouterError(Exception):
+    pass
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class ProviderStats:
+    """Rolling window of time-to-first-token samples and outcomes, plus circuit breaker state."""
+    def __init__(self, window):
+        self.ttft = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success
+        self.consecutive_failures = 0
+        self.opened_at = None  # breaker open since
+        self.trial_at = None  # half-open probe in flight since
+
+    @property
+    def error_rate(self):
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def state(self, cooldown, now=None):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if (now or time.time()) - self.opened_at >= cooldown else "open"
+
+
+class ProviderRouter:
+    """
+    Streams a reply from the preferred provider and falls back down ROUTER_FALLBACKS when a provider
+    is unavailable, fails or produces no first token within ROUTER_FIRST_TOKEN_TIMEOUT.
+    Each provider has a circuit breaker that opens after repeated failures (or a high rolling error rate)
+    and lets a single probe through once ROUTER_BREAKER_COOLDOWN has passed.
+    With ROUTER_HEDGE=1 the next provider is started in parallel when the first has not produced a token
+    by its ROUTER_HEDGE_PERCENTILE time-to-first-token; whichever answers first wins.
+
+    Providers are plain callables stream(sys_msg, history, user_message) yielding text, so stubs can be
+    registered in place of the real SDKs.
+    """
+    def __init__(self):
+        self.providers = {}  # name -> (stream, available)
+        self.stats = {}
+        self.window = int(os.getenv("ROUTER_WINDOW", "50"))
+        self.min_samples = int(os.getenv("ROUTER_MIN_SAMPLES", "10"))
+        self.failure_threshold = int(os.getenv("ROUTER_BREAKER_FAILURES", "3"))
+        self.error_rate_threshold = float(os.getenv("ROUTER_BREAKER_ERROR_RATE", "0.5"))
+        self.cooldown = float(os.getenv("ROUTER_BREAKER_COOLDOWN", "30"))
+        self.hedge = os.getenv("ROUTER_HEDGE", "0") == "1"
+        self.hedge_percentile = float(os.getenv("ROUTER_HEDGE_PERCENTILE", "95"))
+        self.hedge_default = float(os.getenv("ROUTER_HEDGE_DEFAULT", "3"))  # until enough samples
+        self.first_token_timeout = float(os.getenv("ROUTER_FIRST_TOKEN_TIMEOUT", "30"))
+        self.chunk_timeout = float(os.getenv("ROUTER_CHUNK_TIMEOUT", "60"))
+        self.fallbacks = [p.strip() for p in os.getenv("ROUTER_FALLBACKS", "gemini,groq,ollama").split(",") if p.strip()]
+        self.lock = threading.Lock()
+
+    def register(self, name, stream, available=None):
+        with self.lock:
+            self.providers[name] = (stream, available or (lambda: True))
+            self.stats.setdefault(name, ProviderStats(self.window))
+
+    def unregister(self, name):
+        with self.lock:
+            self.providers.pop(name, None)
+
+    def candidates(self, preferred):
+        order = [preferred] + [p for p in self.fallbacks if p != preferred]
+        result = []
+        for name in order:
+            entry = self.providers.get(name)
+            try:
+                if entry and entry[1]():
+                    result.append(name)
+            except Exception: pass
+        return result
+
+    # --- Circuit breaker ---
+
+    def allow(self, name):
+        now = time.time()
+        with self.lock:
+            stats = self.stats[name]
+            state = stats.state(self.cooldown, now)
+            if state == "closed":
+                return True
+            if state == "open":
+                return False
+            # Half-open: one probe at a time; an abandoned probe is retried after another cooldown
+            if stats.trial_at is None or now - stats.trial_at >= self.cooldown:
+                stats.trial_at = now
+                return True
+            return False
+
+    def record_success(self, name, ttft=None):
+        with self.lock:
+            stats = self.stats[name]
+            if ttft is not None:
+                stats.ttft.append(ttft)
+            if stats.opened_at is not None:
+                stats.outcomes.clear()  # Fresh window once the backend has recovered
+                print(f"Router: {name} recovered, closing breaker")
+            stats.outcomes.append(True)
+            stats.consecutive_failures = 0
+            stats.opened_at = stats.trial_at = None
+
+    def record_failure(self, name, error=None):
+        with self.lock:
+            stats = self.stats[name]
+            stats.outcomes.append(False)
+            stats.consecutive_failures += 1
+            tripped = (stats.consecutive_failures >= self.failure_threshold or
+                       (len(stats.outcomes) >= self.min_samples and stats.error_rate >= self.error_rate_threshold))
+            if stats.trial_at is not None or (tripped and stats.opened_at is None):
+                print(f"Router: opening breaker for {name} ({error})")
+                stats.opened_at = time.time()
+                stats.trial_at = None
+
+    def hedge_deadline(self, name):
+        with self.lock:
+            samples = list(self.stats[name].ttft)
+        if len(samples) < self.min_samples:
+            return self.hedge_default
+        return percentile(samples, self.hedge_percentile)
+
+    # --- Streaming ---
+
+    def _launch(self, name, args, out):
+        stop = threading.Event()
+
+        def run():
+            try:
+                for text in self.providers[name][0](*args):
+                    if stop.is_set():
+                        return
+                    if text:
+                        out.put((name, "chunk", text))
+                out.put((name, "done", None))
+            except Exception as e:
+                out.put((name, "error", e))
+
+        threading.Thread(target=run, name=f"liebe-llm-{name}", daemon=True).start()
+        return stop
+
+    def stream(self, preferred, sys_msg, history, user_message):
+        """Yields (provider, text) from the first provider to answer; raises RouterError if none can."""
+        args = (sys_msg, history, user_message)
+        pending = self.candidates(preferred)
+        out = queue.Queue()
+        running = {}  # name -> (stop event, started at)
+        errors = []
+
+        def launch_next():
+            while pending:
+                name = pending.pop(0)
+                if self.allow(name):
+                    running[name] = (self._launch(name, args, out), time.time())
+                    return name
+            return None
+
+        try:
+            primary = launch_next()
+            if not primary:
+                raise RouterError("AI Service not available.")
+            hedge_at = time.time() + self.hedge_deadline(primary) if self.hedge else None
+            give_up_at = time.time() + self.first_token_timeout
+
+            # Wait for the first token from any running provider
+            winner = None
+            while winner is None:
+                now = time.time()
+                deadline = min(give_up_at, hedge_at) if hedge_at and pending else give_up_at
+                try:
+                    name, kind, value = out.get(timeout=max(0, deadline - now))
+                except queue.Empty:
+                    if hedge_at and time.time() >= hedge_at:
+                        hedge_at = None
+                        launch_next()
+                        continue
+                    # Nothing from anyone in time: count every running provider as failed and move on
+                    for name, (stop, _) in running.items():
+                        stop.set()
+                        self.record_failure(name, "no first token")
+                        errors.append(f"{name}: timed out")
+                    running.clear()
+                    if not launch_next():
+                        raise RouterError("All AI services failed: " + "; ".join(errors))
+                    give_up_at = time.time() + self.first_token_timeout
+                    continue
+
+                if name not in running:
+                    continue  # Leftovers from an abandoned provider
+                if kind == "chunk":
+                    winner = name
+                    self.record_success(name, ttft=time.time() - running[name][1])
+                    for other, (stop, _) in running.items():
+                        if other != name: stop.set()
+                    yield name, value
+                    continue
+
+                # Failed (or empty) before the first token: fall back
+                del running[name]
+                self.record_failure(name, value if kind == "error" else "empty response")
+                errors.append(f"{name}: {value if kind == 'error' else 'empty response'}")
+                if not running and not launch_next():
+                    raise RouterError("All AI services failed: " + "; ".join(errors))
+                give_up_at = time.time() + self.first_token_timeout
+
+            while True:
+                try:
+                    name, kind, value = out.get(timeout=self.chunk_timeout)
+                except queue.Empty:
+                    self.record_failure(winner, "stream stalled")
+                    raise RouterError(f"{winner} stopped responding")
+                if name != winner:
+                    continue
+                if kind == "chunk":
+                    yield name, value
+                elif kind == "done":
+                    return
+                else:
+                    # Tokens were already sent, so a mid-stream failure can't be retried elsewhere
+                    self.record_failure(winner, value)
+                    raise RouterError(f"Generation failed: {value}")
+        finally:
+            # Also runs when the consumer closes the generator early (client gone before the first token)
+            for stop, _ in running.values():
+                stop.set()
+
+    def get_stats(self):
+        now = time.time()
+        with self.lock:
+            return {
+                name: {
+                    "state": stats.state(self.cooldown, now),
+                    "samples": len(stats.outcomes),
+                    "error_rate": round(stats.error_rate, 3),
+                    "ttft_p50": percentile(list(stats.ttft), 50),
+                    "ttft_p95": percentile(list(stats.ttft), 95),
+                    "consecutive_failures": stats.consecutive_failures,
+                }
+                for name, stats in self.stats.items()
+            }
+
+provider_router = ProviderRouter()
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+
+class Generation:
+    """Events of one chat reply, kept after the client goes away so it can reconnect and catch up."""
+    def __init__(self, stream_id):
+        self.id = stream_id
+        self.events = []  # payload strings; event seq is index + 1
+        self.done = False
+        self.finished_at = None
+        self.cond = threading.Condition()
+
+    def append(self, payload):
+        with self.cond:
+            self.events.append(payload)
+            self.cond.notify_all()
+
+    def finish(self):
+        with self.cond:
+            self.done = True
+            self.finished_at = time.time()
+            self.cond.notify_all()
+
+
+class StreamBuffer:
+    """
+    Runs /api/chat generations on their own thread and buffers their SSE events under ids
+    '<stream_id>:<seq>', so a dropped connection neither aborts the reply nor loses it: a reconnect
+    with Last-Event-ID replays what was missed and follows the rest live.
+    Finished generations are kept for SSE_RESUME_TTL seconds. Buffers are per process, so with several
+    workers a resume can land elsewhere and get a 404; the reply is still saved to history.
+
+    With SSE_COALESCE_MS set, followers send consecutive token chunks as one frame per window; they send
+    a comment every SSE_HEARTBEAT seconds while the model is silent, which keeps proxies from closing the stream.
+    """
+    def __init__(self):
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.resume_ttl = float(os.getenv("SSE_RESUME_TTL", "120"))
+        self.max_streams = int(os.getenv("SSE_MAX_STREAMS", "200"))
+        self.coalesce = float(os.getenv("SSE_COALESCE_MS", "0")) / 1000  # 0 = one frame per chunk
+        self.heartbeat = float(os.getenv("SSE_HEARTBEAT", "15"))
+        self.retry_ms = int(os.getenv("SSE_RETRY_MS", "2000"))
+
+    def start(self, events):
+        """Consumes the events iterable (JSON strings) in the background; returns the Generation."""
+        generation = Generation(uuid.uuid4().hex)
+        with self.lock:
+            self._evict()
+            self.streams[generation.id] = generation
+
+        def run():
+            try:
+                for payload in events:
+                    generation.append(payload)
+            except Exception as e:
+                print(f"Chat stream {generation.id} failed: {e}")
+                generation.append(json.dumps({"status": "error", "message": str(e)}))
+            finally:
+                generation.finish()
+
+        threading.Thread(target=run, name=f"liebe-chat-{generation.id[:8]}", daemon=True).start()
+        return generation
+
+    def _evict(self):
+        now = time.time()
+        for stream_id, g in list(self.streams.items()):
+            if g.done and now - g.finished_at > self.resume_ttl:
+                del self.streams[stream_id]
+        # Still over the cap: drop the oldest finished ones first
+        if len(self.streams) >= self.max_streams:
+            finished = sorted((g.finished_at, sid) for sid, g in self.streams.items() if g.done)
+            for _, stream_id in finished[:len(self.streams) - self.max_streams + 1]:
+                del self.streams[stream_id]
+
+    def get(self, stream_id):
+        with self.lock:
+            return self.streams.get(stream_id)
+
+    @staticmethod
+    def parse_event_id(event_id):
+        """(stream_id, seq) from '<stream_id>:<seq>', or None."""
+        try:
+            stream_id, seq = (event_id or "").rsplit(":", 1)
+            return stream_id, int(seq)
+        except ValueError:
+            return None
+
+    def _merge(self, batch):
+        # Runs of chunks from the same provider become one frame carrying the id of the last
+        frames = []
+        for seq, payload in batch:
+            update = json.loads(payload)
+            last = frames[-1] if frames else None
+            if (last and update.get("status") == "chunk" and last[1].get("status") == "chunk"
+                    and last[1].get("service") == update.get("service")):
+                last[1]["text"] += update.get("text", "")
+                last[0] = seq
+            else:
+                frames.append([seq, update])
+        return [(seq, json.dumps(update)) for seq, update in frames]
+
+    def follow(self, generation, after=0):
+        """SSE frames for events after seq, then live ones until the generation finishes."""
+        yield f"retry: {self.retry_ms}\n\n"
+        sent = after
+        while True:
+            with generation.cond:
+                if len(generation.events) <= sent and not generation.done:
+                    generation.cond.wait(self.heartbeat)
+                batch = list(enumerate(generation.events[sent:], start=sent + 1))
+                done = generation.done
+            if not batch:
+                if done:
+                    return
+                yield ": keepalive\n\n"
+                continue
+            frames = self._merge(batch) if self.coalesce > 0 else batch
+            for seq, payload in frames:
+                yield f"id: {generation.id}:{seq}\ndata: {payload}\n\n"
+            sent = batch[-1][0]
+            if self.coalesce > 0 and not done:
+                time.sleep(self.coalesce)  # Let the next few tokens pile up into one frame
+
+stream_buffer = StreamBuffer()
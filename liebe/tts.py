@@ -0,0 +1,265 @@
+import os
+import re
+import uuid
+import queue
+import asyncio
+import hashlib
+import json
+import threading
+
+VOICE = "en-US-AriaNeural"
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+_DONE = object()
+
+
+def clean_tts_text(text):
+    # Strip markdown emphasis and leftover [TAG:...] markers before speaking
+    text = re.sub(r'\*+', '', text)
+    return re.sub(r'\[.*?\]', '', text)
+
+
+def split_sentences(text, min_chars=None):
+    """Splits text at sentence boundaries, merging short sentences so each segment is worth a request."""
+    min_chars = min_chars or int(os.getenv("TTS_MIN_SEGMENT_CHARS", "80"))
+    segments = []
+    for sentence in SENTENCE_END_RE.split(text.strip()):
+        if not sentence: continue
+        if segments and len(segments[-1]) < min_chars:
+            segments[-1] += " " + sentence
+        else:
+            segments.append(sentence)
+    return segments
+
+
+class TTSEngine:
+    """
+    Runs edge-tts on one long-lived event loop in a background thread.
+    Long text is split into sentences that are synthesized with bounded parallelism (TTS_PARALLELISM)
+    and emitted strictly in order, so the first sentence streams while later ones are being prepared.
+    """
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.parallelism = int(os.getenv("TTS_PARALLELISM", "3"))
+        self.chunk_timeout = float(os.getenv("TTS_CHUNK_TIMEOUT", "30"))
+        self.pending = {}  # cache key -> future for prefetches in flight
+        self.lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name="liebe-tts", daemon=True)
+                self.thread.start()
+        return self.loop
+
+    async def _synthesize(self, text, voice, out):
+        import edge_tts  # Deferred so cold starts that never speak don't pay for it
+        communicate = edge_tts.Communicate(text, voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                out.put(chunk["data"])
+
+    async def _run(self, segments, voice, outputs):
+        sem = asyncio.Semaphore(self.parallelism)
+
+        async def one(text, out):
+            async with sem:
+                try:
+                    await self._synthesize(text, voice, out)
+                    out.put(_DONE)
+                except Exception as e:
+                    out.put(e)
+
+        await asyncio.gather(*(one(text, out) for text, out in zip(segments, outputs)))
+
+    def stream(self, text, voice=VOICE):
+        """Yields MP3 bytes for text; segment failures are raised to the caller."""
+        segments = split_sentences(text) or [text]
+        outputs = [queue.Queue() for _ in segments]
+        future = asyncio.run_coroutine_threadsafe(self._run(segments, voice, outputs), self._ensure_loop())
+        try:
+            for out in outputs:
+                while True:
+                    try:
+                        item = out.get(timeout=self.chunk_timeout)
+                    except queue.Empty:
+                        raise TimeoutError("TTS segment stalled")
+                    if item is _DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            # Client went away or a segment failed: stop synthesizing the rest
+            future.cancel()
+
+    def synthesize(self, text, voice=VOICE):
+        return b"".join(self.stream(text, voice))
+
+    async def _collect(self, text, voice):
+        out = queue.Queue()
+        await self._synthesize(text, voice, out)
+        return b"".join(out.queue)
+
+    def prefetch(self, text, voice, cache):
+        """Starts synthesizing text into cache in the background and returns its cache key."""
+        key = cache.key(text, voice)
+        loop = self._ensure_loop()
+        with self.lock:
+            if key in self.pending or cache.lookup(key):
+                return key
+            future = asyncio.run_coroutine_threadsafe(self._collect(text, voice), loop)
+            self.pending[key] = future
+
+        def done(f):
+            try:
+                cache.store(key, f.result())
+            except Exception as e: print(f"TTS prefetch failed: {e}")
+            finally:
+                with self.lock:
+                    self.pending.pop(key, None)
+
+        future.add_done_callback(done)
+        return key
+
+    def wait(self, key, timeout=None):
+        with self.lock:
+            future = self.pending.get(key)
+        if future:
+            try:
+                future.result(timeout=timeout or self.chunk_timeout)
+            except Exception: pass
+
+
+class SpeechStream:
+    """
+    Turns chat_stream updates into ordered 'audio' events: complete sentences are detected as chunks
+    arrive and prefetched into the TTS cache, so playback can start while the LLM is still generating.
+    """
+    def __init__(self, engine, cache, voice=VOICE, min_chars=None):
+        self.engine = engine
+        self.cache = cache
+        self.voice = voice
+        self.min_chars = min_chars or int(os.getenv("TTS_STREAM_MIN_CHARS", "40"))
+        self.buffer = ""
+        self.seq = 0
+        self.streamed = False
+
+    def _take_sentences(self, final=False):
+        sentences = []
+        while True:
+            cut = None
+            for m in SENTENCE_END_RE.finditer(self.buffer):
+                if m.start() >= self.min_chars:
+                    cut = m
+                    break
+            if not cut:
+                break
+            sentences.append(self.buffer[:cut.start()])
+            self.buffer = self.buffer[cut.end():]
+        if final and self.buffer.strip():
+            sentences.append(self.buffer)
+            self.buffer = ""
+        return sentences
+
+    def feed(self, update):
+        status = update.get("status")
+        if status == "chunk":
+            self.streamed = True
+            self.buffer += update.get("text", "")
+            sentences = self._take_sentences()
+        elif status == "done":
+            if not self.streamed:
+                self.buffer = update.get("full_text", "")  # Non-streamed replies (e.g. OpenClaw)
+            sentences = self._take_sentences(final=True)
+        else:
+            return []
+
+        events = []
+        for sentence in sentences:
+            text = clean_tts_text(sentence).strip()
+            if not re.search(r"\w", text):
+                continue
+            key = self.engine.prefetch(text, self.voice, self.cache)
+            events.append(json.dumps({"status": "audio", "seq": self.seq, "url": f"/api/tts/segment/{key}"}))
+            self.seq += 1
+        return events
+
+
+class TTSCache:
+    """
+    Content-addressed MP3 cache: one file per sha256(voice, cleaned text).
+    Files are touched on every hit and the least recently used ones are evicted past TTS_CACHE_MAX_MB.
+    """
+    def __init__(self):
+        self.cache_dir = None
+        self.max_bytes = int(float(os.getenv("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024)
+        self.lock = threading.Lock()
+
+    def init_dir(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice=VOICE):
+        return hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def lookup(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)  # Mark as recently used
+            return path
+        except OSError:
+            return None
+
+    def store(self, key, data):
+        if not data: return
+        part = os.path.join(self.cache_dir, f"{key}.{uuid.uuid4().hex}.part")
+        with open(part, "wb") as f:
+            f.write(data)
+        os.replace(part, self.path(key))
+        self.evict()
+
+    def tee(self, key, chunks):
+        """Yields audio chunks to the client while writing them to the cache; partial streams are discarded."""
+        part = os.path.join(self.cache_dir, f"{key}.{uuid.uuid4().hex}.part")
+        complete = False
+        try:
+            with open(part, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete and os.path.getsize(part) > 0:
+                os.replace(part, self.path(key))
+                self.evict()
+            else:
+                try:
+                    os.remove(part)
+                except OSError: pass
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".mp3"): continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((st.st_mtime, st.st_size, name))
+                except OSError: pass
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    total -= size
+                except OSError: pass
+
+tts_engine = TTSEngine()
+tts_cache = TTSCache()
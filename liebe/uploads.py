@@ -0,0 +1,85 @@
+import os
+import re
+import uuid
+import hashlib
+import mimetypes
+from werkzeug.utils import secure_filename
+
+DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+URL_RE = re.compile(r"/api/uploads/([0-9a-f]{64})/([^/]+)$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadStore:
+    """
+    Content-addressed attachment store: each upload is streamed to disk in chunks while it is hashed
+    and kept once under objects/<sha256>, so re-uploading the same file costs nothing.
+    The URL carries the digest plus the original (sanitised) name, which is only used for display
+    and the content type.
+    """
+    def __init__(self):
+        self.upload_dir = None
+        self.objects_dir = None
+        self.max_bytes = int(float(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+        self.chunk_size = int(os.getenv("UPLOAD_CHUNK_KB", "256")) * 1024
+
+    def init_dir(self, upload_dir):
+        self.upload_dir = upload_dir
+        self.objects_dir = os.path.join(upload_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.objects_dir, digest)
+
+    @staticmethod
+    def display_name(filename, max_chars=120):
+        # ChatMessage.file_path is 255 chars, so long names are shortened but keep their extension
+        name = secure_filename(filename or "") or "file"
+        stem, ext = os.path.splitext(name)
+        return stem[:max_chars - len(ext)] + ext
+
+    @staticmethod
+    def url(digest, name):
+        return f"/api/uploads/{digest}/{name}"
+
+    @staticmethod
+    def parse_url(file_path):
+        """(digest, name) for a content-addressed upload URL, None for legacy or foreign paths."""
+        m = URL_RE.search(file_path or "")
+        return (m.group(1), m.group(2)) if m else None
+
+    @staticmethod
+    def content_type(name):
+        return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    def save(self, stream):
+        """Copies stream to the store; returns (digest, size, created). Raises UploadTooLarge past MAX_UPLOAD_MB."""
+        part = os.path.join(self.objects_dir, f"{uuid.uuid4().hex}.part")
+        sha = hashlib.sha256()
+        size = 0
+        try:
+            with open(part, "wb") as f:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"File exceeds {self.max_bytes // (1024 * 1024)} MB limit")
+                    sha.update(chunk)
+                    f.write(chunk)
+            digest = sha.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                return digest, size, False  # Already stored; the new copy is discarded below
+            os.replace(part, target)
+            return digest, size, True
+        finally:
+            try:
+                os.remove(part)
+            except OSError: pass
+
+upload_store = UploadStore()
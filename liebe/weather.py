@@ -0,0 +1,57 @@
+import os
+import re
+from liebe.http_client import http_client
+
+# Filler words stripped from free-form queries like "whats the weather in pune today"
+FILLER_RE = re.compile(r"\b(weather|in|at|of|whats|the|today's|todays)\b")
+
+
+def normalize_city(query):
+    city = " ".join(FILLER_RE.sub("", query.lower()).split()).strip("? .!,\"").strip()
+    return city.title() or "Mumbai"
+
+
+class WeatherReport:
+    def __init__(self, city, temp=None, desc=None, humidity=None, wind=None, error=None):
+        self.city = city
+        self.temp = temp
+        self.desc = desc
+        self.humidity = humidity
+        self.wind = wind
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_markdown(self):
+        if self.error: return self.error
+        return f"### Weather in {self.city}\n**Temperature:** {self.temp}°C\n**Conditions:** {self.desc}\n**Humidity:** {self.humidity}%\n**Wind Speed:** {self.wind} m/s"
+
+    def to_dict(self):
+        if self.error: return {'error': self.error, 'city': self.city}
+        return {
+            'temp': self.temp,
+            'desc': self.desc,
+            'humidity': self.humidity,
+            'wind': self.wind,
+            'city': self.city
+        }
+
+
+def fetch_weather(city):
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    if not api_key: return WeatherReport(city, error="WEATHER ERROR: Missing key.")
+    try:
+        url = os.getenv("OPENWEATHER_API_URL", "http://api.openweathermap.org/data/2.5/weather")
+        params = {"q": city, "appid": api_key, "units": "metric"}
+        data = http_client.get(url, profile="weather", params=params).json()
+        if data.get("cod") != 200: return WeatherReport(city, error=f"Weather data not found for {city}.")
+        return WeatherReport(
+            city,
+            temp=round(data["main"]["temp"], 1),
+            desc=data["weather"][0]["description"].capitalize(),
+            humidity=data["main"]["humidity"],
+            wind=data["wind"]["speed"]
+        )
+    except Exception as e: return WeatherReport(city, error=f"Weather error: {str(e)}")
@@ -1,5 +1,5 @@
 import os
-import requests
+from liebe.http_client import http_client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,7 +7,7 @@ load_dotenv()
 class YouTubeManager:
     def __init__(self):
         self.api_key = os.getenv("YOUTUBE_API_KEY")
-        self.base_url = "https://www.googleapis.com/youtube/v3"
+        self.base_url = os.getenv("YOUTUBE_API_URL", "https://www.googleapis.com/youtube/v3")
 
     def is_api_valid(self):
         if not self.api_key or self.api_key == "your_youtube_api_key_here":
@@ -42,7 +42,7 @@ class YouTubeManager:
                     "key": self.api_key
                 }
 
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = http_client.get(endpoint, profile="youtube", params=params)
             data = response.json()
 
             if "error" in data:
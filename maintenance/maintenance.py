@@ -1,8 +1,9 @@
 import sys
 import os
+from datetime import datetime
 from werkzeug.security import generate_password_hash
-from app import app
-from models import db, FailedAttempt
+from app import app, purge_tombstones
+from models import db, FailedAttempt, ChatMessage, ChatSession, DailyNote, Alarm
 
 def show_usage():
     print("\n--- LIEBE AI MAINTENANCE TOOL ---")
@@ -10,6 +11,9 @@ def show_usage():
     print("  python maintenance.py hash <password>   - Generate a secure hash for .env")
     print("  python maintenance.py reset            - Unlock all IP addresses (reset attempts)")
     print("  python maintenance.py fix <password>     - Automatically update .env with house-cleaned hash and reset locks")
+    print("  python maintenance.py migrate          - Create new tables/columns/indexes and backfill chat session summaries")
+    print("  python maintenance.py startup          - Report cold-start time and the slowest imports")
+    print("  python maintenance.py purge            - Remove note/alarm tombstones older than SYNC_TOMBSTONE_DAYS")
     print("----------------------------------\n")
 
 def gen_hash(password):
@@ -23,6 +27,80 @@ def reset_locks():
         db.session.commit()
         print(f"Successfully cleared {num} lockout records.")
 
+def add_missing_columns():
+    # create_all never alters existing tables, so new model columns are added here
+    from sqlalchemy import inspect, text
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                if column.default is not None and column.default.is_scalar:
+                    conn.execute(table.update().where(column.is_(None)).values({column.name: column.default.arg}))
+            print(f"Added column {table.name}.{column.name}")
+
+def migrate():
+    from sqlalchemy import func
+    with app.app_context():
+        # create_all only adds missing tables; indexes on existing tables need an explicit create
+        db.create_all()
+        add_missing_columns()
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # Rows from before change tracking need an updated_at for /api/sync and the list ETags
+        for model in (DailyNote, Alarm):
+            model.query.filter(model.updated_at.is_(None)).update({model.updated_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        print("Tables and indexes are up to date.")
+
+        if ChatSession.query.first() is not None:
+            print("Chat session summaries already populated.")
+            return
+        stats = db.session.query(
+            ChatMessage.session_id, func.count(ChatMessage.id), func.max(ChatMessage.timestamp)
+        ).group_by(ChatMessage.session_id).all()
+        for session_id, count, last_ts in stats:
+            last = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).first()
+            first_user = ChatMessage.query.filter_by(session_id=session_id, role='user').order_by(ChatMessage.timestamp.asc()).first()
+            db.session.add(ChatSession(
+                session_id=session_id,
+                title=first_user.content[:255] if first_user else None,
+                last_message=last.content,
+                last_role=last.role,
+                last_timestamp=last_ts,
+                message_count=count
+            ))
+        db.session.commit()
+        print(f"Backfilled {len(stats)} chat session summaries.")
+
+def startup_report(top=15):
+    # Fresh interpreter so nothing is already imported; -X importtime prints per-module cumulative times
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, BRIEFING_PREPARER="0", OLLAMA_WARMUP="0")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=root, env=env, capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # Modules app imports directly; deeper ones are included in these
+            modules.append((int(cumulative), name.strip()))
+    print(next((l for l in result.stdout.splitlines() if l.startswith("Startup:")), "Startup report not found."))
+    print("\nSlowest imports made by app:")
+    for cumulative, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+def purge_deleted():
+    with app.app_context():
+        print(f"Purged {purge_tombstones()} deleted notes/alarms.")
+
 def master_fix(password):
     new_hash = generate_password_hash(password)
     env_path = ".env"
@@ -56,6 +134,12 @@ if __name__ == "__main__":
         gen_hash(sys.argv[2])
     elif cmd == "reset":
         reset_locks()
+    elif cmd == "migrate":
+        migrate()
+    elif cmd == "startup":
+        startup_report()
+    elif cmd == "purge":
+        purge_deleted()
     elif cmd == "fix" and len(sys.argv) > 2:
         master_fix(sys.argv[2])
     else:
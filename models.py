@@ -9,6 +9,9 @@ class DailyNote(db.Model):
     content = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(20), default='regular')
     timestamp = db.Column(db.Float, default=datetime.now().timestamp)
+    # Change tracking for /api/sync: deletes only set deleted_at so clients can see them
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    deleted_at = db.Column(db.DateTime, index=True)
 
     def to_dict(self):
         return {
@@ -16,7 +19,8 @@ class DailyNote(db.Model):
             'date_str': self.date_str,
             'content': self.content,
             'type': self.type,
-            'timestamp': self.timestamp
+            'timestamp': self.timestamp,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Alarm(db.Model):
@@ -25,6 +29,8 @@ class Alarm(db.Model):
     time_value = db.Column(db.String(50), nullable=False)
     display = db.Column(db.String(50))
     prepared = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    deleted_at = db.Column(db.DateTime, index=True)
 
     def to_dict(self):
         return {
@@ -32,10 +38,14 @@ class Alarm(db.Model):
             'type': self.type,
             'time_value': self.time_value,
             'display': self.display,
-            'prepared': self.prepared
+            'prepared': self.prepared,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class ChatMessage(db.Model):
+    # Serves per-session history reads in timestamp order without scanning the table
+    __table_args__ = (db.Index('ix_chat_message_session_ts', 'session_id', 'timestamp', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(50), nullable=False, default='default')
     role = db.Column(db.String(20), nullable=False)
@@ -54,6 +64,29 @@ class ChatMessage(db.Model):
             'file_type': self.file_type,
             'timestamp': self.timestamp.isoformat()
         }
+
+class ChatSession(db.Model):
+    # One row per session, maintained alongside every ChatMessage insert (see ChatWriter)
+    session_id = db.Column(db.String(50), primary_key=True)
+    title = db.Column(db.String(255))
+    last_message = db.Column(db.Text)
+    last_role = db.Column(db.String(20))
+    last_timestamp = db.Column(db.DateTime, index=True)
+    message_count = db.Column(db.Integer, default=0)
+    # Rolling summary of the turns up to summary_upto_id that no longer fit the prompt window
+    summary = db.Column(db.Text)
+    summary_upto_id = db.Column(db.Integer, default=0)
+
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'title': self.title,
+            'content': self.last_message,
+            'role': self.last_role,
+            'timestamp': self.last_timestamp.isoformat() if self.last_timestamp else None,
+            'message_count': self.message_count
+        }
+
 class FailedAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     ip_address = db.Column(db.String(50), unique=True, nullable=False)
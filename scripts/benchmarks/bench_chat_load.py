@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+# Set absolute path to root directory
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_DIR)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+PASSWORD = "bench-password"
+MESSAGES = {
+    "chat": ["Tell me something interesting about octopuses and how they think",
+             "Help me plan a relaxed Sunday with some reading and a long walk"],
+    "weather": ["What's the weather in Pune", "weather in Mumbai today"],
+    "search": ["search the latest price of nvidia stock", "find details about the new metro line"],
+    "video": ["suggest youtube tutorial on how to learn python", "watch video about sourdough baking"],
+}
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+    return {"p50": round(pick(50), 4), "p95": round(pick(95), 4), "p99": round(pick(99), 4),
+            "mean": round(sum(ordered) / len(ordered), 4), "max": round(ordered[-1], 4)}
+
+
+def sleep_latency(base, jitter):
+    time.sleep(max(0.0, base + random.uniform(-jitter, jitter)))
+
+
+# --- Stand-ins for the external services ---
+
+class StubHTTPHandler(BaseHTTPRequestHandler):
+    """OpenWeather and YouTube Data API look-alikes with configurable latency."""
+    latency = 0.1
+    jitter = 0.0
+
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        sleep_latency(self.latency, self.jitter)
+        path = urlparse(self.path).path
+        if path.endswith("/weather"):
+            body = {"cod": 200, "main": {"temp": 28.4, "humidity": 61}, "weather": [{"description": "scattered clouds"}], "wind": {"speed": 3.1}}
+        elif path.endswith("/search") or path.endswith("/videos"):
+            item = {"id": {"videoId": "bench123"}, "snippet": {"title": "Bench video", "channelTitle": "Bench",
+                    "publishedAt": "2024-01-01T00:00:00Z", "thumbnails": {"high": {"url": "https://example.invalid/t.jpg"}}}}
+            body = {"items": [item, item]}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubDDGS:
+    """Replaces ddgs.DDGS so the real search formatting and cache run without the network."""
+    latency = 0.2
+    jitter = 0.0
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+    def text(self, query, max_results=3):
+        sleep_latency(self.latency, self.jitter)
+        return [{"title": f"Result {i} for {query}", "body": "Lorem ipsum dolor sit amet " * 5} for i in range(max_results)]
+
+    news = text
+
+
+def stub_provider(name, ttft, chunk_interval, chunks, jitter, error_rate):
+    words = ("Sure, here is a short answer with a few sentences. It keeps going for a while. " * 8).split()
+
+    def stream(sys_msg, history, user_message):
+        sleep_latency(ttft, jitter)
+        if random.random() < error_rate:
+            raise RuntimeError(f"{name} stub failure")
+        for i in range(chunks):
+            yield " ".join(words[(i * 3) % len(words):(i * 3) % len(words) + 3]) + " "
+            if chunk_interval:
+                sleep_latency(chunk_interval, jitter * chunk_interval)
+    return stream
+
+
+# --- Harness ---
+
+def start_server(app, host="127.0.0.1"):
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # No per-request access log
+    server = make_server(host, 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def configure_environment(stub_url, db_path):
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "OPENWEATHER_API_KEY": "bench",
+        "OPENWEATHER_API_URL": f"{stub_url}/data/2.5/weather",
+        "YOUTUBE_API_KEY": "bench",
+        "YOUTUBE_API_URL": f"{stub_url}/youtube/v3",
+        "BRIEFING_PREPARER": "0",
+        "OLLAMA_WARMUP": "0",
+        "OLLAMA_LOCAL_TIER": "0",
+    })
+
+
+def run_session(base_url, messages, results, inflight, lock):
+    import requests
+    http = requests.Session()
+    http.post(f"{base_url}/api/login", json={"password": PASSWORD}).raise_for_status()
+    session_id = f"bench_{threading.get_ident()}_{time.time_ns()}"
+
+    for message in messages:
+        record = {"ok": False, "kind": message[0]}
+        with lock:
+            inflight[0] += 1
+            inflight[1] = max(inflight[1], inflight[0])
+        start = time.perf_counter()
+        try:
+            with http.post(f"{base_url}/api/chat", json={"message": message[1], "session_id": session_id}, stream=True) as resp:
+                record["headers"] = time.perf_counter() - start
+                first = None
+                text = ""
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if event.get("status") == "chunk":
+                        if first is None:
+                            first = time.perf_counter()
+                            record["ttft"] = first - start
+                        text += event.get("text", "")
+                    elif event.get("status") == "done":
+                        text = event.get("full_text", text)
+                        record["ok"] = True
+                    elif event.get("status") == "error":
+                        record["error"] = event.get("message")
+                end = time.perf_counter()
+                record["total"] = end - start
+                if first and end > first:
+                    record["tokens_per_sec"] = (len(text) / 4) / (end - first)  # ~4 chars per token
+        except Exception as e:
+            record["error"] = str(e)
+        finally:
+            with lock:
+                inflight[0] -= 1
+        results.append(record)
+
+
+def summarize(results, wall, cpu, peak_inflight, peak_threads, sessions):
+    ok = [r for r in results if r["ok"]]
+    by_kind = {}
+    for r in ok:
+        by_kind.setdefault(r["kind"], []).append(r["total"])
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_samples": sorted({r.get("error") for r in results if r.get("error")})[:5],
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "ttft": percentiles([r["ttft"] for r in ok if "ttft" in r]),
+        "time_to_headers": percentiles([r["headers"] for r in ok if "headers" in r]),
+        "total_latency": percentiles([r["total"] for r in ok]),
+        "total_latency_by_kind": {k: percentiles(v) for k, v in by_kind.items()},
+        "tokens_per_sec": percentiles([r["tokens_per_sec"] for r in ok if "tokens_per_sec" in r]),
+        "saturation": {
+            "sessions": sessions,
+            "peak_inflight": peak_inflight,
+            "peak_threads": peak_threads,
+            "cpu_utilization": round(cpu / wall, 3) if wall else None,  # Process CPU seconds per wall second
+        },
+        "wall_seconds": round(wall, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["summary"]
+    print(f"\nAgainst {os.path.basename(baseline_path)}:")
+    for metric in ("ttft", "total_latency", "tokens_per_sec"):
+        for p in ("p50", "p95", "p99"):
+            old, new = (baseline.get(metric) or {}).get(p), (current.get(metric) or {}).get(p)
+            if old and new:
+                print(f"  {metric:<15} {p}: {old:8.4f} -> {new:8.4f}  ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SSE load test for /api/chat against stubbed providers")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent chat sessions")
+    parser.add_argument("--requests", type=int, default=5, help="messages per session")
+    parser.add_argument("--ttft", type=float, default=0.3, help="stub LLM time to first token (s)")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="stub LLM delay between chunks (s)")
+    parser.add_argument("--chunks", type=int, default=40, help="chunks per stub reply")
+    parser.add_argument("--tool-latency", type=float, default=0.15, help="weather/YouTube/search stand-in latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="+/- latency jitter (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of primary provider calls that fail")
+    parser.add_argument("--mix", default="chat=0.6,weather=0.15,search=0.15,video=0.1", help="message kind weights")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="result JSON path (default: results/chat_load_<commit>_<time>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier result JSON to compare against")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    StubHTTPHandler.latency = StubDDGS.latency = args.tool_latency
+    StubHTTPHandler.jitter = StubDDGS.jitter = args.jitter
+    stub_server = ThreadingHTTPServer(("127.0.0.1", 0), StubHTTPHandler)
+    threading.Thread(target=stub_server.serve_forever, daemon=True).start()
+    stub_url = f"http://127.0.0.1:{stub_server.server_port}"
+
+    db_dir = tempfile.mkdtemp(prefix="liebe-bench-")
+    configure_environment(stub_url, os.path.join(db_dir, "bench.db"))
+
+    import ddgs
+    from werkzeug.security import generate_password_hash
+    ddgs.DDGS = StubDDGS
+    from app import app
+    from liebe.orchestrator import orchestrator
+    from liebe.chat_writer import chat_writer
+
+    app.config.update(SESSION_COOKIE_SECURE=False, USER_PASSWORD_HASH=generate_password_hash(PASSWORD))
+    for name in ("gemini", "groq", "groq_r1", "ollama"):
+        error_rate = args.error_rate if name == "gemini" else 0.0
+        orchestrator.router.register(name, stub_provider(name, args.ttft, args.chunk_interval, args.chunks, args.jitter, error_rate))
+
+    weights = dict((k, float(v)) for k, v in (p.split("=") for p in args.mix.split(",")))
+    kinds = list(weights)
+    plan = [[(kind, random.choice(MESSAGES[kind])) for kind in random.choices(kinds, [weights[k] for k in kinds], k=args.requests)]
+            for _ in range(args.sessions)]
+
+    server, base_url = start_server(app)
+    results, inflight, lock = [], [0, 0], threading.Lock()
+    peak_threads = [threading.active_count()]
+    done = threading.Event()
+
+    def watch_threads():
+        while not done.is_set():
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            time.sleep(0.05)
+
+    threading.Thread(target=watch_threads, daemon=True).start()
+    workers = [threading.Thread(target=run_session, args=(base_url, plan[i], results, inflight, lock)) for i in range(args.sessions)]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for w in workers: w.start()
+    for w in workers: w.join()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    done.set()
+    chat_writer.flush()
+    server.shutdown()
+    stub_server.shutdown()
+
+    summary = summarize(results, wall, cpu, inflight[1], peak_threads[0], args.sessions)
+    report = {
+        "benchmark": "chat_load",
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "router": orchestrator.router.get_stats(),
+        "summary": summary,
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"chat_load_{report['commit'] or 'nogit'}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nRequests: {summary['requests']}  errors: {summary['errors']}  throughput: {summary['throughput_rps']} req/s")
+    for metric in ("ttft", "total_latency", "tokens_per_sec"):
+        p = summary[metric] or {}
+        print(f"  {metric:<15} p50 {p.get('p50')}  p95 {p.get('p95')}  p99 {p.get('p99')}")
+    print(f"  saturation      {summary['saturation']}")
+    print(f"Saved {out}")
+    if args.baseline:
+        compare(summary, args.baseline)
+    return 1 if summary["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
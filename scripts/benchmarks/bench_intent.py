@@ -0,0 +1,100 @@
+import os
+import sys
+import random
+import timeit
+
+# Set absolute path to root directory
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_DIR)
+
+from liebe.intent import IntentMatcher, KEYWORD_GROUPS
+
+
+def legacy_analyze_intent(user_message):
+    # Verbatim copy of the keyword scans analyze_intent used before IntentMatcher
+    msg = user_message.lower().strip()
+    greetings = ["hi", "hello", "hey", "hola", "yo", "hi liebe", "hello liebe", "hey liebe", "yo liebe"]
+    words = msg.split()
+    conversational_starters = ["how are you", "what's up", "good morning", "good evening", "good night", "thanks", "thank you", "nice to meet you"]
+    is_basic = any(g == msg for g in greetings) or any(s in msg for s in conversational_starters) or (len(words) <= 3 and not any(k in msg for k in ["weather", "time", "alarm", "news", "note", "search", "find", "tutorial", "video", "save", "remind"]))
+    is_greeting = is_basic and (msg in greetings or any(g in msg for g in ["hi ", "hello ", "hey ", "yo "]))
+    search_keywords = [
+        "search", "find", "latest", "price", "stock", "what is the status",
+        "details about", "cource", "course", "syllabus", "news in", "events",
+        "scenario", "update on"
+    ]
+    news_keywords = ["news", "headline", "breaking"]
+    weather_keywords = ["weather", "temperature", "forecast", "climate"]
+    video_keywords = ["tutorial", "learn", "how to", "course video", "suggest youtube", "watch video"]
+    security_keywords = ["nmap", "scan", "vulnerability", "hack", "penetration", "exploit", "kali", "security tools", "ports"]
+    info = {
+        "needs_search": any(k in msg for k in search_keywords) and not is_basic,
+        "is_news_search": any(k in msg for k in news_keywords),
+        "is_weather": any(k in msg for k in weather_keywords),
+        "is_video": any(k in msg for k in video_keywords),
+        "is_alarm": any(k in msg for k in ["alarm", "wake me up", "timer"]),
+        "is_note": any(k in msg for k in ["remind", "save", "note", "task", "remember", "write", "assignment", "deadline", "todo", "project", "meeting", "appointment", "submit"]),
+        "is_security": any(k in msg for k in security_keywords),
+        "is_basic": is_basic,
+        "is_greeting": is_greeting,
+        "selected_service": "gemini"
+    }
+    if info["is_security"]:
+        info["selected_service"] = "openclaw"
+    elif "local" in msg or "ollama" in msg:
+        info["selected_service"] = "ollama"
+    elif any(k in msg for k in ["think", "reason", "math", "logic", "complex", "why"]):
+        info["selected_service"] = "groq_r1"
+    elif any(k in msg for k in ["code", "program", "python"]):
+        info["selected_service"] = "groq"
+    return info
+
+
+SAMPLES = [
+    "hi", "Hello Liebe", "how are you doing today?", "what's the weather in Pune",
+    "search the latest price of nvidia stock", "set an alarm for 6:30 tomorrow",
+    "remind me to submit the assignment before the deadline on friday",
+    "suggest youtube tutorial on how to learn python", "why is the sky blue? think step by step",
+    "run an nmap scan on the open ports of my kali box", "write python code to parse a csv file",
+    "give me the breaking news headlines in India", "use the local ollama model to summarise this",
+    "Can you explain the syllabus for the machine learning course video series and any events this week?",
+]
+
+
+def fuzz_corpus(n=2000, seed=7):
+    rng = random.Random(seed)
+    vocab = [w for words in KEYWORD_GROUPS.values() for w in words] + [
+        "the", "a", "my", "please", "tomorrow", "sushi", "this", "is", "yo", "hey", "hello", "hi",
+        "you", "today", "liebe", "course", "video", "to", "how", "up", "me", "wake"
+    ]
+    corpus = []
+    for _ in range(n):
+        words = [rng.choice(vocab) for _ in range(rng.randint(1, 12))]
+        sep = rng.choice([" ", "", " ", "  "])
+        corpus.append(sep.join(words))
+    return corpus
+
+
+def main():
+    matcher = IntentMatcher()
+    corpus = SAMPLES + fuzz_corpus()
+
+    mismatches = [m for m in corpus if matcher.classify(m) != legacy_analyze_intent(m)]
+    print(f"Equivalence: {len(corpus) - len(mismatches)}/{len(corpus)} identical")
+    for m in mismatches[:10]:
+        print(f"  MISMATCH: {m!r}")
+
+    rounds = int(os.getenv("BENCH_ROUNDS", "20"))
+    legacy = min(timeit.repeat(lambda: [legacy_analyze_intent(m) for m in corpus], number=1, repeat=rounds))
+    single = min(timeit.repeat(lambda: [matcher.classify(m) for m in corpus], number=1, repeat=rounds))
+    batch = min(timeit.repeat(lambda: matcher.classify_many(corpus), number=1, repeat=rounds))
+
+    per_msg = lambda t: t / len(corpus) * 1e6
+    print(f"\nMessages: {len(corpus)}  (best of {rounds})")
+    print(f"  legacy any() scans : {per_msg(legacy):7.2f} us/msg")
+    print(f"  IntentMatcher      : {per_msg(single):7.2f} us/msg  ({legacy / single:.2f}x)")
+    print(f"  classify_many      : {per_msg(batch):7.2f} us/msg  ({legacy / batch:.2f}x)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
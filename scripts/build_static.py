@@ -0,0 +1,92 @@
+"""
+Builds content-hashed copies of the static assets into static/dist plus a manifest.json that
+templates (asset_url) and the service worker read. Text assets also get precompressed .gz and
+.br variants (brotli is in requirements.txt; without it the build warns and writes gzip only).
+
+    python scripts/build_static.py [--clean]
+"""
+import os
+import sys
+import gzip
+import json
+import shutil
+import argparse
+
+# Set absolute path to root directory
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from liebe.assets import content_hash, DIST_DIR, MANIFEST_NAME, UNHASHED
+
+STATIC_DIR = os.path.join(ROOT_DIR, "static")
+COMPRESSIBLE = {".js", ".css", ".json", ".svg", ".html", ".txt", ".ico"}
+MIN_COMPRESS_BYTES = 1024
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def source_files():
+    for dirpath, dirnames, filenames in os.walk(STATIC_DIR):
+        rel_dir = os.path.relpath(dirpath, STATIC_DIR)
+        if rel_dir == DIST_DIR or rel_dir.startswith(DIST_DIR + os.sep):
+            dirnames[:] = []
+            continue
+        for name in sorted(filenames):
+            rel = os.path.normpath(os.path.join(rel_dir, name)).replace(os.sep, "/")
+            if rel not in UNHASHED:
+                yield rel
+
+
+def write_compressed(path, data):
+    """Writes .gz/.br next to path when they are actually smaller; returns their sizes."""
+    sizes = {}
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    for ext, packed in variants:
+        if len(packed) < len(data):
+            with open(path + ext, "wb") as f:
+                f.write(packed)
+            sizes[ext] = len(packed)
+    return sizes
+
+
+def build(clean=False):
+    dist_dir = os.path.join(STATIC_DIR, DIST_DIR)
+    if clean and os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    files = {}
+    for rel in source_files():
+        source = os.path.join(STATIC_DIR, rel)
+        digest = content_hash(source)
+        stem, ext = os.path.splitext(rel)
+        hashed = f"{stem}.{digest}{ext}"
+        target = os.path.join(dist_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if not os.path.exists(target):  # Same hash, same bytes: earlier builds are reused
+            shutil.copyfile(source, target)
+        with open(source, "rb") as f:
+            data = f.read()
+        sizes = write_compressed(target, data) if ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES else {}
+        files[rel] = {"path": hashed, "hash": digest, "size": len(data)}
+        detail = ", ".join(f"{e[1:]} {s:,}" for e, s in sizes.items())
+        print(f"  {rel} -> {hashed} ({len(data):,} bytes{', ' + detail if detail else ''})")
+
+    part = os.path.join(dist_dir, MANIFEST_NAME + ".part")
+    with open(part, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, indent=2, sort_keys=True)
+    os.replace(part, os.path.join(dist_dir, MANIFEST_NAME))
+    print(f"Wrote {len(files)} assets to static/{DIST_DIR}")
+    if not brotli:
+        print("WARNING: brotli is not installed, so no .br variants were built; pip install -r requirements.txt", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets")
+    parser.add_argument("--clean", action="store_true", help="Remove builds of older asset versions first")
+    build(clean=parser.parse_args().clean)
@@ -97,27 +97,41 @@ document.addEventListener('DOMContentLoaded', () => {
     let currentWeekStart = getWeekStart(new Date());
     let selectedDate = new Date();
     selectedDate.setHours(0, 0, 0, 0);
-    let currentChatHistory = [];
     let currentSessionId = localStorage.getItem('liebe_session_id') || 'default';
 
     // --- API SYNC ---
+    // Incremental: only rows changed since the last cursor come back; reset replaces everything
+    let syncCursor = null;
+    let noteRows = new Map();
+    let alarmRows = new Map();
+
+    function applyChanges(rows, changes, reset) {
+        if (reset) rows.clear();
+        changes.upserts.forEach(r => rows.set(r.id, r));
+        changes.deletes.forEach(id => rows.delete(id));
+    }
+
     async function syncData() {
         try {
-            const [notesRes, alarmsRes] = await Promise.all([
-                fetch('/api/notes'),
-                fetch('/api/alarms')
-            ]);
-            const notesData = await notesRes.json();
-            const alarmsData = await alarmsRes.json();
+            const res = await fetch('/api/sync' + (syncCursor ? `?since=${encodeURIComponent(syncCursor)}` : ''));
+            if (res.status === 400) {
+                syncCursor = null;  // Cursor no longer understood: take a full snapshot next time
+                return syncData();
+            }
+            const data = await res.json();
+            applyChanges(noteRows, data.notes, data.reset);
+            applyChanges(alarmRows, data.alarms, data.reset);
+            syncCursor = data.cursor;
 
             // Transform notes list into date-keyed object
             notes = {};
-            notesData.forEach(n => {
+            noteRows.forEach(n => {
                 if (!notes[n.date_str]) notes[n.date_str] = [];
                 notes[n.date_str].push(n);
             });
+            Object.values(notes).forEach(list => list.sort((a, b) => a.id - b.id));
 
-            alarms = alarmsData;
+            alarms = [...alarmRows.values()].sort((a, b) => a.id - b.id);
 
             updateAlarmsUI();
             renderWeeklyCalendar();
@@ -405,7 +419,6 @@ document.addEventListener('DOMContentLoaded', () => {
         // Start a completely new session with unique ID
         currentSessionId = 'session_' + Date.now();
         localStorage.setItem('liebe_session_id', currentSessionId);
-        currentChatHistory = [];
 
         renderSessions();
     }
@@ -478,7 +491,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     const item = document.createElement('div');
                     item.className = `history-item ${s.session_id === currentSessionId ? 'active' : ''}`;
 
-                    let titleChat = s.content || "Empty Chat";
+                    let titleChat = s.title || s.content || "Empty Chat";
                     if (titleChat.length > 25) titleChat = titleChat.substring(0, 25) + '...';
 
                     item.innerHTML = `<span style="opacity:0.6; margin-right:8px;">💬</span> ${titleChat}`;
@@ -502,7 +515,6 @@ document.addEventListener('DOMContentLoaded', () => {
     async function switchSession(id) {
         currentSessionId = id;
         localStorage.setItem('liebe_session_id', id);
-        currentChatHistory = [];
         document.getElementById('chatContainer').innerHTML = '';
         await loadChatHistory(id);
         renderSessions();
@@ -533,6 +545,50 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // --- SPOKEN REPLIES ---
+    // When enabled, /api/chat streams 'audio' events per sentence; play them back in order
+    const speakBtn = document.getElementById('speakBtn');
+    let speakReplies = localStorage.getItem('liebe_speak_replies') === '1';
+    const speechQueue = [];
+    let replyAudio = null;
+
+    if (speakBtn) {
+        speakBtn.classList.toggle('active', speakReplies);
+        speakBtn.addEventListener('click', () => {
+            speakReplies = !speakReplies;
+            localStorage.setItem('liebe_speak_replies', speakReplies ? '1' : '0');
+            speakBtn.classList.toggle('active', speakReplies);
+            if (!speakReplies) stopReplySpeech();
+        });
+    }
+
+    function playNextSpeech() {
+        const url = speechQueue.shift();
+        if (!url) {
+            replyAudio = null;
+            return;
+        }
+        replyAudio = new Audio(url);
+        replyAudio.onended = playNextSpeech;
+        replyAudio.onerror = playNextSpeech;
+        replyAudio.play().catch(playNextSpeech);
+    }
+
+    function enqueueSpeech(url) {
+        speechQueue.push(url);
+        if (!replyAudio) playNextSpeech();
+    }
+
+    function stopReplySpeech() {
+        speechQueue.length = 0;
+        if (replyAudio) {
+            replyAudio.onended = null;
+            replyAudio.onerror = null;
+            replyAudio.pause();
+            replyAudio = null;
+        }
+    }
+
     async function uploadFile() {
         if (!selectedFile) return null;
 
@@ -544,6 +600,12 @@ document.addEventListener('DOMContentLoaded', () => {
                 method: 'POST',
                 body: formData
             });
+            if (!res.ok) {
+                // e.g. 413 past MAX_UPLOAD_MB
+                const err = await res.json().catch(() => ({}));
+                alert(err.error || 'Upload failed.');
+                return null;
+            }
             return await res.json();
         } catch (e) {
             console.error("Upload failed", e);
@@ -552,6 +614,33 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // Send Interaction
+    // Minimal SSE parser for fetch responses: calls onEvent({ id, data, retry }) per event
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const blocks = buffer.split('\n\n');
+            buffer = blocks.pop(); // Keep partial event in buffer
+
+            for (const block of blocks) {
+                const event = { id: null, data: null, retry: null };
+                for (const line of block.split('\n')) {
+                    if (line.startsWith(':')) continue; // Heartbeat comment
+                    if (line.startsWith('id: ')) event.id = line.substring(4).trim();
+                    else if (line.startsWith('data: ')) event.data = (event.data ? event.data + '\n' : '') + line.substring(6);
+                    else if (line.startsWith('retry: ')) event.retry = parseInt(line.substring(7), 10);
+                }
+                onEvent(event);
+            }
+        }
+    }
+
     async function sendMessage() {
         if (!sendBtn.classList.contains('active')) return;
 
@@ -574,6 +663,8 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         }
 
+        stopReplySpeech();
+
         // Check toggle states
         let useSearch = false;
         let useDeepThinking = false;
@@ -615,72 +706,85 @@ document.addEventListener('DOMContentLoaded', () => {
         let aiFullText = "";
 
         try {
-            const response = await fetch('/api/chat', {
+            let response = await fetch('/api/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     message: message,
-                    history: currentChatHistory,
                     session_id: currentSessionId,
                     search_enabled: useSearch,
                     deep_thinking_enabled: useDeepThinking,
+                    speak: speakReplies,
                     file_path: fileData ? fileData.file_path : null,
                     file_type: fileData ? fileData.file_type : null
                 })
             });
 
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            let buffer = "";
             let service = "none";
+            let finished = false;
+
+            const handleEvent = (data) => {
+                if (data.status === 'progress') {
+                    progressBubble.querySelector('.progress-msg').innerText = data.message;
+                } else if (data.status === 'chunk') {
+                    if (!aiBubble) {
+                        progressBubble.style.display = 'none';
+                        aiBubble = document.createElement('div');
+                        aiBubble.className = 'message-bubble ai';
+                        chatContainer.appendChild(aiBubble);
+                    }
+                    aiFullText += data.text;
+                    aiBubble.innerHTML = formatMessageText(aiFullText);
+                    chatContainer.scrollTop = chatContainer.scrollHeight;
+                } else if (data.status === 'done') {
+                    service = data.service;
+                    aiFullText = data.full_text;
+                    if (aiBubble) renderFinalAiBubble(aiBubble, aiFullText, service);
+
+                    // Refresh sessions list to update titles
+                    renderSessions();
+
+                } else if (data.status === 'audio') {
+                    enqueueSpeech(data.url);
+                } else if (data.status === 'error') {
+                    progressBubble.innerHTML = `<span style="color: #ff6b6b;">❌ ${data.message}</span>`;
+                }
+            };
 
+            // Events carry ids '<stream>:<seq>'; if the connection drops mid-reply, pick up after the last one
+            let streamId = response.headers.get('X-Stream-Id');
+            let lastEventId = null;
+            let retryMs = 2000;
+            let attempts = 0;
             while (true) {
-                const { value, done } = await reader.read();
-                if (done) break;
-
-                buffer += decoder.decode(value, { stream: true });
-                const lines = buffer.split('\n');
-                buffer = lines.pop(); // Keep partial line in buffer
-
-                for (const line of lines) {
-                    const trimmedLine = line.trim();
-                    if (!trimmedLine.startsWith('data: ')) continue;
-
-                    try {
-                        const data = JSON.parse(trimmedLine.substring(6));
-
-                        if (data.status === 'progress') {
-                            progressBubble.querySelector('.progress-msg').innerText = data.message;
-                        } else if (data.status === 'chunk') {
-                            if (!aiBubble) {
-                                progressBubble.style.display = 'none';
-                                aiBubble = document.createElement('div');
-                                aiBubble.className = 'message-bubble ai';
-                                chatContainer.appendChild(aiBubble);
-                            }
-                            aiFullText += data.text;
-                            aiBubble.innerHTML = formatMessageText(aiFullText);
-                            chatContainer.scrollTop = chatContainer.scrollHeight;
-                        } else if (data.status === 'done') {
-                            service = data.service;
-                            aiFullText = data.full_text;
-                            if (aiBubble) renderFinalAiBubble(aiBubble, aiFullText, service);
-
-                            currentChatHistory.push({ role: 'user', content: message });
-                            currentChatHistory.push({ role: 'assistant', content: aiFullText });
-                            if (currentChatHistory.length > 20) currentChatHistory = currentChatHistory.slice(-20);
-
-                            // Refresh sessions list to update titles
-                            renderSessions();
-
-                        } else if (data.status === 'error') {
-                            progressBubble.innerHTML = `<span style="color: #ff6b6b;">❌ ${data.message}</span>`;
+                try {
+                    await readEventStream(response, (event) => {
+                        if (event.retry) retryMs = event.retry;
+                        if (event.id) lastEventId = event.id;
+                        if (!event.data) return;
+                        try {
+                            const data = JSON.parse(event.data);
+                            if (data.status === 'done' || data.status === 'error') finished = true;
+                            handleEvent(data);
+                        } catch (e) {
+                            console.error("Single event parse error", e, event.data);
                         }
-                    } catch (e) {
-                        console.error("Single line parse error", e, trimmedLine);
-                    }
+                    });
+                } catch (e) {
+                    console.warn('Chat stream interrupted', e);
+                }
+                if (finished || !streamId || ++attempts > 5) break;
+                await new Promise(resolve => setTimeout(resolve, retryMs));
+                try {
+                    response = await fetch(`/api/chat/stream/${streamId}`, {
+                        headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {}
+                    });
+                } catch (e) {
+                    continue;  // Still offline; try again after the next delay
                 }
+                if (!response.ok) break;  // Expired or served by another worker; the reply is in history
             }
+            if (!finished) throw new Error('Chat stream ended before the reply finished');
         } catch (error) {
             console.error('Error:', error);
             if (progressBubble) progressBubble.innerHTML = 'Error communicating with server.';
@@ -701,6 +805,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const activeAlarmsList = document.getElementById('activeAlarmsList');
 
     let currentBriefingScript = "";
+    let currentBriefingAudioUrl = null;
+    let activeAlarm = null;
     let isSpeaking = false;
 
     function updateAlarmsUI() {
@@ -717,8 +823,23 @@ document.addEventListener('DOMContentLoaded', () => {
         `).join('');
     }
 
+    // The server prepares script + audio ahead of each alarm; fetch it if it's ready
+    async function fetchPreparedBriefing(alarm) {
+        try {
+            const response = await fetch(`/api/alarms/${alarm.id}/briefing`);
+            if (!response.ok) return false;
+            const data = await response.json();
+            currentBriefingScript = data.script;
+            currentBriefingAudioUrl = data.audio_url || null;
+            return true;
+        } catch (e) {
+            return false;
+        }
+    }
+
     async function prepareBriefing(alarm) {
         if (alarm.prepared || alarm.type === 'timer') return;
+        if (await fetchPreparedBriefing(alarm)) return;
 
         console.log("Liebe is preparing morning briefing...");
 
@@ -827,6 +948,8 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function triggerAlarm(alarm) {
+        activeAlarm = alarm;
+        if (alarm.type === 'alarm' && !currentBriefingScript) fetchPreparedBriefing(alarm);
         document.getElementById('alarmTimeText').innerText = alarm.type === 'timer' ? `Timer finished!` : `It's ${alarm.time_value}`;
         alarmModal.style.display = 'block';
         try {
@@ -843,6 +966,10 @@ document.addEventListener('DOMContentLoaded', () => {
         const briefingText = document.getElementById('briefingText');
         const briefingStatus = document.getElementById('briefingStatus');
 
+        if (!currentBriefingScript && activeAlarm && activeAlarm.type === 'alarm') {
+            await fetchPreparedBriefing(activeAlarm);
+        }
+
         if (!currentBriefingScript) {
             briefingText.innerText = "One moment please, Liebe is gathering your morning data...";
             briefingStatus.innerText = "Loading Briefing...";
@@ -921,7 +1048,9 @@ document.addEventListener('DOMContentLoaded', () => {
             window.currentAudio.src = "";
         }
 
-        const audioUrl = `/api/tts?text=${encodeURIComponent(text)}`;
+        const audioUrl = (currentBriefingAudioUrl && text === currentBriefingScript)
+            ? currentBriefingAudioUrl
+            : `/api/tts?text=${encodeURIComponent(text)}`;
         const audio = new Audio(audioUrl);
         window.currentAudio = audio;
 
@@ -1050,6 +1179,12 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    function attachmentName(path) {
+        // Content-addressed uploads end in /<sha256>/<name>; legacy ones are /<timestamp>_<name>
+        const last = decodeURIComponent(path.split('/').pop());
+        return /\/[0-9a-f]{64}\/[^/]+$/.test(path) ? last : last.split('_').slice(1).join('_');
+    }
+
     function addMessage(text, sender, service = 'none', fileData = null) {
         const chatContainer = document.getElementById('chatContainer');
         const bubble = document.createElement('div');
@@ -1061,7 +1196,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (fileData.file_type && fileData.file_type.startsWith('image/')) {
                 fileContent.innerHTML = `<img src="${fileData.file_path}" alt="Attached Photo" style="max-width: 100%; border-radius: 12px; margin-bottom: 8px; cursor: pointer;" onclick="window.open('${fileData.file_path}', '_blank')">`;
             } else {
-                const fileName = fileData.file_path.split('_').slice(1).join('_');
+                const fileName = attachmentName(fileData.file_path);
                 fileContent.innerHTML = `
                     <a href="${fileData.file_path}" target="_blank" style="display: flex; align-items: center; gap: 10px; padding: 10px; background: rgba(255,255,255,0.05); border-radius: 8px; text-decoration: none; color: inherit;">
                         <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M13 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V9z"></path><polyline points="13 2 13 9 20 9"></polyline></svg>
@@ -1209,7 +1344,7 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             const response = await fetch('/api/weather?city=Mumbai');
             const data = await response.json();
-            if (data.temp) {
+            if (data.temp !== null && data.temp !== undefined) {
                 weatherTemp.innerText = `${data.temp}°C`;
 
                 // Update Modal details too
@@ -1240,10 +1375,87 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // Load History
+    // The server returns the latest page; older pages are fetched with the 'before' cursor on scroll-up
+    let historyCursor = null;
+    let historyHasMore = false;
+    let historyLoading = false;
+
+    function buildHistoryBubble(msg) {
+        // For historical messages, avoid full re-rendering of effects
+        const bubble = document.createElement('div');
+        bubble.className = `message-bubble ${msg.role === 'assistant' ? 'ai' : 'user'}`;
+
+        // Render file if exists
+        if (msg.file_path) {
+            const fileContent = document.createElement('div');
+            fileContent.className = 'message-file-attachment';
+            if (msg.file_type && msg.file_type.startsWith('image/')) {
+                fileContent.innerHTML = `<img src="${msg.file_path}" alt="Attached Photo" style="max-width: 100%; border-radius: 12px; margin-bottom: 8px; cursor: pointer;" onclick="window.open('${msg.file_path}', '_blank')">`;
+            } else {
+                const fileName = attachmentName(msg.file_path);
+                fileContent.innerHTML = `
+                    <a href="${msg.file_path}" target="_blank" style="display: flex; align-items: center; gap: 10px; padding: 10px; background: rgba(255,255,255,0.05); border-radius: 8px; text-decoration: none; color: inherit;">
+                        <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M13 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V9z"></path><polyline points="13 2 13 9 20 9"></polyline></svg>
+                        <span style="font-size: 13px;">${fileName || 'Attached File'}</span>
+                    </a>
+                `;
+            }
+            bubble.appendChild(fileContent);
+        }
+
+        const textContent = document.createElement('div');
+        if (msg.role === 'user') {
+            textContent.innerHTML = formatMessageText(msg.content);
+        } else {
+            // Strip tags for history view to avoid double-processing
+            const clean = msg.content.replace(/\[ALARM:.*?\]/g, '').replace(/\[TIMER:.*?\]/g, '').replace(/\[NOTE:.*?\]/g, '');
+            textContent.innerHTML = formatMessageText(clean);
+        }
+        bubble.appendChild(textContent);
+        return bubble;
+    }
+
+    async function fetchHistoryPage(sessionId, before = null) {
+        let url = `/api/chat/history?session_id=${encodeURIComponent(sessionId)}&limit=50`;
+        if (before) url += `&before=${encodeURIComponent(before)}`;
+        const response = await fetch(url);
+        const data = await response.json();
+        historyCursor = data.before;
+        historyHasMore = data.has_more;
+        return data.messages || [];
+    }
+
+    async function loadOlderHistory() {
+        if (!historyHasMore || historyLoading) return;
+        historyLoading = true;
+        try {
+            const sessionId = currentSessionId;
+            const messages = await fetchHistoryPage(sessionId, historyCursor);
+            if (sessionId !== currentSessionId) return;
+
+            const chatContainer = document.getElementById('chatContainer');
+            const previousHeight = chatContainer.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            messages.forEach(msg => fragment.appendChild(buildHistoryBubble(msg)));
+            chatContainer.insertBefore(fragment, chatContainer.firstChild);
+            // Keep the viewport anchored on the message the user was reading
+            chatContainer.scrollTop += chatContainer.scrollHeight - previousHeight;
+        } catch (e) {
+            console.error("Older history load error:", e);
+        } finally {
+            historyLoading = false;
+        }
+    }
+
+    document.getElementById('chatContainer').addEventListener('scroll', (e) => {
+        if (e.target.scrollTop < 50) loadOlderHistory();
+    });
+
     async function loadChatHistory(sessionId = currentSessionId) {
         try {
-            const response = await fetch(`/api/chat/history?session_id=${sessionId}`);
-            const data = await response.json();
+            historyCursor = null;
+            historyHasMore = false;
+            const data = await fetchHistoryPage(sessionId);
 
             const logoArea = document.querySelector('.logo-area');
             const mainContent = document.querySelector('.main-content');
@@ -1254,42 +1466,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (mainContent) mainContent.classList.add('chat-active');
                 if (chatContainer) {
                     chatContainer.classList.add('active');
-                    data.forEach(msg => {
-                        // For historical messages, avoid full re-rendering of effects
-                        const bubble = document.createElement('div');
-                        bubble.className = `message-bubble ${msg.role === 'assistant' ? 'ai' : 'user'}`;
-
-                        // Render file if exists
-                        if (msg.file_path) {
-                            const fileContent = document.createElement('div');
-                            fileContent.className = 'message-file-attachment';
-                            if (msg.file_type && msg.file_type.startsWith('image/')) {
-                                fileContent.innerHTML = `<img src="${msg.file_path}" alt="Attached Photo" style="max-width: 100%; border-radius: 12px; margin-bottom: 8px; cursor: pointer;" onclick="window.open('${msg.file_path}', '_blank')">`;
-                            } else {
-                                const fileName = msg.file_path.split('_').slice(1).join('_');
-                                fileContent.innerHTML = `
-                                    <a href="${msg.file_path}" target="_blank" style="display: flex; align-items: center; gap: 10px; padding: 10px; background: rgba(255,255,255,0.05); border-radius: 8px; text-decoration: none; color: inherit;">
-                                        <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M13 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V9z"></path><polyline points="13 2 13 9 20 9"></polyline></svg>
-                                        <span style="font-size: 13px;">${fileName || 'Attached File'}</span>
-                                    </a>
-                                `;
-                            }
-                            bubble.appendChild(fileContent);
-                        }
-
-                        const textContent = document.createElement('div');
-                        if (msg.role === 'user') {
-                            textContent.innerHTML = formatMessageText(msg.content);
-                        } else {
-                            // Strip tags for history view to avoid double-processing
-                            const clean = msg.content.replace(/\[ALARM:.*?\]/g, '').replace(/\[TIMER:.*?\]/g, '').replace(/\[NOTE:.*?\]/g, '');
-                            textContent.innerHTML = formatMessageText(clean);
-                        }
-                        bubble.appendChild(textContent);
-
-                        chatContainer.appendChild(bubble);
-                        currentChatHistory.push({ role: msg.role, content: msg.content });
-                    });
+                    data.forEach(msg => chatContainer.appendChild(buildHistoryBubble(msg)));
                     chatContainer.scrollTop = chatContainer.scrollHeight;
                 }
             } else {
@@ -1,3 +1,4 @@
+// CACHE_NAME and ASSETS are rewritten from the asset manifest when served at /sw.js
 const CACHE_NAME = 'liebe-v1';
 const ASSETS = [
     '/',
@@ -12,7 +13,21 @@ self.addEventListener('install', (event) => {
     );
 });
 
+self.addEventListener('activate', (event) => {
+    // Drop the caches of earlier builds
+    event.waitUntil(
+        caches.keys().then((keys) => Promise.all(
+            keys.filter((key) => key !== CACHE_NAME).map((key) => caches.delete(key))
+        ))
+    );
+});
+
 self.addEventListener('fetch', (event) => {
+    if (event.request.mode === 'navigate') {
+        // Pages come from the network so they pick up new asset hashes; the cached copy is the offline fallback
+        event.respondWith(fetch(event.request).catch(() => caches.match('/')));
+        return;
+    }
     event.respondWith(
         caches.match(event.request).then((response) => response || fetch(event.request))
     );